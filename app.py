@@ -248,11 +248,11 @@ def start_professional_processing():
                         
                         alignment_result = alignment_optimizer.optimize_segment(segment, target_duration)
                         
-                        if alignment_result["success"]:
-                            segment["translated_audio_path"] = alignment_result["audio_path"]
-                            segment["speed"] = alignment_result["speed"]
-                            segment["translated_text"] = alignment_result.get("optimized_text", translated_text)
-                            segment["ratio"] = alignment_result.get("ratio", 1.0)
+                        if alignment_result.success:
+                            segment["translated_audio_path"] = alignment_result.audio_path
+                            segment["speed"] = alignment_result.speed
+                            segment["translated_text"] = alignment_result.optimized_text
+                            segment["ratio"] = alignment_result.ratio or 1.0
                             logger_service.log("INFO", f"第{sequence}句对齐优化成功")
                         else:
                             logger_service.log("WARNING", f"第{sequence}句对齐优化失败，使用原始音频")
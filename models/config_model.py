@@ -12,7 +12,9 @@ class ConfigModel:
         self.min_segment_duration = 1.5
         self.max_segment_duration = 8.0
         self.silence_threshold = 0.3
-        
+        self.skip_llm_ratio = 1.3  # 比例低于该阈值时跳过LLM文本优化，直接速度调整
+        self.tts_concurrency = 4  # 批量对齐优化的并发片段数
+
         # 音频预处理配置
         self.enable_voice_extraction = True  # 是否启用人声背景音分离
         
@@ -59,6 +61,8 @@ class ConfigModel:
             "min_segment_duration": self.min_segment_duration,
             "max_segment_duration": self.max_segment_duration,
             "silence_threshold": self.silence_threshold,
+            "skip_llm_ratio": self.skip_llm_ratio,
+            "tts_concurrency": self.tts_concurrency,
             "enable_voice_extraction": self.enable_voice_extraction,
             "supported_languages": self.supported_languages,
             "tts_models": self.tts_models,
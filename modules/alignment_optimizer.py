@@ -1,574 +1,1001 @@
-import os
-import time
-from typing import Dict, Any, Tuple
-
-class AlignmentOptimizer:
-    def __init__(self, config, translation_service, tts_service, logger_service):
-        self.config = config
-        self.translation_service = translation_service
-        self.tts_service = tts_service
-        self.logger = logger_service
-        
-    def _get_trimmed_duration(self, audio_path: str, segment_id: int, step: str) -> float:
-        """获取去除静音后的音频时长"""
-        # 先尝试静音裁剪
-        trimmed_path = f"./temp/segment_{segment_id}_{step}_trimmed.mp3"
-        trim_result = self.tts_service.trim_silence(audio_path, trimmed_path)
-        
-        if trim_result["success"]:
-            trimmed_duration = trim_result["trimmed_duration"]
-            self.logger.log("DEBUG", f"音频静音裁剪成功: {audio_path} -> {trimmed_duration:.2f}s")
-            return trimmed_duration
-        else:
-            # 如果裁剪失败，使用原始时长
-            original_duration = self.tts_service.get_audio_duration(audio_path)
-            self.logger.log("WARNING", f"音频静音裁剪失败，使用原始时长: {original_duration:.2f}s")
-            return original_duration
-
-    def optimize_segment(self, segment: Dict[str, Any], target_duration: float) -> Dict[str, Any]:
-        """5步时间戳对齐优化算法"""
-        segment_id = segment.get('sequence', 0)
-        original_text = segment.get('original_text', '')
-        translated_text = segment.get('translated_text', '')
-        voice_id = segment.get('voice_id', '')
-        
-        self.logger.log("INFO", f"开始第{segment_id}句5步时间戳对齐优化...")
-        
-        # 第一步：静音裁剪检查
-        step1_result = self._step1_silence_trimming(segment, target_duration)
-        if step1_result["success"]:
-            return step1_result
-        
-        # 第二步：文本优化
-        step2_result = self._step2_text_optimization(segment, target_duration)
-        if step2_result["success"]:
-            return step2_result
-        
-        # 第三步：首次速度调整
-        step3_result = self._step3_speed_adjustment(segment, target_duration)
-        if step3_result["success"]:
-            return step3_result
-        
-        # 第四步：速度递增重试
-        step4_result = self._step4_speed_retry(segment, target_duration)
-        if step4_result["success"]:
-            return step4_result
-        
-        # 第五步：失败处理（静音）
-        step5_result = self._step5_failure_handling(segment, target_duration)
-        return step5_result
-    
-    def _step1_silence_trimming(self, segment: Dict[str, Any], target_duration: float) -> Dict[str, Any]:
-        """第一步：状态分析和静音裁剪检查"""
-        segment_id = segment.get('sequence', 0)
-        
-        # 检查是否已有翻译音频文件
-        existing_audio_path = segment.get('translated_audio_path')
-        current_duration = 0.0
-        ratio = 0.0
-        
-        if existing_audio_path and os.path.exists(existing_audio_path):
-            # 获取现有音频时长
-            current_duration = self.tts_service.get_audio_duration(existing_audio_path)
-            ratio = current_duration / target_duration if target_duration > 0 else 999.0
-            
-            self.logger.log_alignment_step(
-                segment_id, 1, "状态分析", 
-                f"当前声音时长: {current_duration:.2f}s, 目标时长: {target_duration:.2f}s, "
-                f"当前比例: {ratio:.2f}, 比例<1: {ratio < 1.0}, 下一步措施: {'直接使用' if ratio <= 1.0 else '需要优化'}"
-            )
-            
-            # 如果比例小于等于1，说明时长合适，直接使用
-            if ratio <= 1.0:
-                self.logger.log_alignment_step(
-                    segment_id, 1, "状态分析", 
-                    f"成功! 现有音频时长{current_duration:.2f}s ≤ 目标时长{target_duration:.2f}s，直接使用",
-                    {"current_duration": current_duration, "target_duration": target_duration}
-                )
-                
-                return {
-                    "success": True,
-                    "step": 1,
-                    "audio_path": existing_audio_path,
-                    "duration": current_duration,
-                    "speed": 1.0,
-                    "optimized_text": segment['translated_text'],
-                    "ratio": round(ratio, 2)
-                }
-        else:
-            # 没有现有音频，需要先生成
-            estimated_duration = len(segment.get('translated_text', '')) * 0.15  # 粗略估算
-            ratio = estimated_duration / target_duration if target_duration > 0 else 999.0
-            
-            self.logger.log_alignment_step(
-                segment_id, 1, "状态分析", 
-                f"当前声音时长: 无现有音频(估算{estimated_duration:.2f}s), 目标时长: {target_duration:.2f}s, "
-                f"当前比例: {ratio:.2f}, 比例<1: {ratio < 1.0}, 下一步措施: 生成TTS音频"
-            )
-            
-            # 生成初始TTS音频
-            tts_result = self.tts_service.synthesize_speech(
-                segment['translated_text'],
-                segment['voice_id'],
-                1.0,
-                f"./temp/segment_{segment_id}_step1.mp3"
-            )
-            
-            if not tts_result["success"]:
-                self.logger.log_alignment_step(
-                    segment_id, 1, "静音裁剪检查", f"TTS生成失败: {tts_result['error']}"
-                )
-                return {"success": False, "error": tts_result['error'], "step": 1}
-            
-            current_duration = self._get_trimmed_duration(tts_result["audio_path"], segment_id, "step1")
-            ratio = current_duration / target_duration if target_duration > 0 else 999.0
-            
-            self.logger.log_alignment_step(
-                segment_id, 1, "状态分析", 
-                f"TTS生成后 - 当前声音时长: {current_duration:.2f}s, 目标时长: {target_duration:.2f}s, "
-                f"当前比例: {ratio:.2f}, 比例<1: {ratio < 1.0}, 下一步措施: {'静音裁剪检查' if ratio > 1.0 else '直接使用'}"
-            )
-            
-            if ratio <= 1.0:
-                self.logger.log_alignment_step(
-                    segment_id, 1, "静音裁剪检查", 
-                    f"成功! 生成音频时长{current_duration:.2f}s ≤ 目标时长{target_duration:.2f}s",
-                    {"current_duration": current_duration, "target_duration": target_duration}
-                )
-                
-                return {
-                    "success": True,
-                    "step": 1,
-                    "audio_path": tts_result["audio_path"],
-                    "duration": current_duration,
-                    "speed": 1.0,
-                    "optimized_text": segment['translated_text'],
-                    "trace_id": tts_result.get("trace_id"),
-                    "ratio": round(ratio, 2)
-                }
-            
-            existing_audio_path = tts_result["audio_path"]
-        
-        # 如果到这里，说明音频时长超过目标，尝试静音裁剪
-        self.logger.log_alignment_step(
-            segment_id, 1, "静音裁剪检查", 
-            f"音频超时，尝试静音裁剪: {current_duration:.2f}s > {target_duration:.2f}s"
-        )
-        
-        trim_result = self.tts_service.trim_silence(
-            existing_audio_path,
-            f"./temp/segment_{segment_id}_step1_trimmed.mp3"
-        )
-        
-        if trim_result["success"]:
-            trimmed_duration = trim_result["trimmed_duration"]
-            new_ratio = trimmed_duration / target_duration if target_duration > 0 else 999.0
-            
-            self.logger.log_alignment_step(
-                segment_id, 1, "静音裁剪检查", 
-                f"裁剪后 - 当前声音时长: {trimmed_duration:.2f}s, 目标时长: {target_duration:.2f}s, "
-                f"当前比例: {new_ratio:.2f}, 比例<1: {new_ratio < 1.0}, 下一步措施: {'成功' if new_ratio <= 1.0 else '需要文本优化'}"
-            )
-            
-            if new_ratio <= 1.0:
-                self.logger.log_alignment_step(
-                    segment_id, 1, "静音裁剪检查", 
-                    f"成功! 裁剪后时长{trimmed_duration:.2f}s ≤ 目标时长{target_duration:.2f}s",
-                    {"trimmed_duration": trimmed_duration, "target_duration": target_duration}
-                )
-                
-                return {
-                    "success": True,
-                    "step": 1,
-                    "audio_path": trim_result["output_path"],
-                    "duration": trimmed_duration,
-                    "speed": 1.0,
-                    "optimized_text": segment['translated_text'],
-                    "ratio": round(new_ratio, 2)
-                }
-            else:
-                current_duration = trimmed_duration
-        
-        # 记录失败信息供下一步使用
-        self._last_duration = current_duration
-        self.logger.log_alignment_step(
-            segment_id, 1, "静音裁剪检查",
-            f"失败: 裁剪后时长{current_duration:.2f}s > 目标时长{target_duration:.2f}s, 进入文本优化"
-        )
-        
-        return {"success": False, "step": 1, "actual_duration": current_duration}
-    
-    def _step2_text_optimization(self, segment: Dict[str, Any], target_duration: float) -> Dict[str, Any]:
-        """第二步：文本优化"""
-        segment_id = segment.get('sequence', 0)
-        
-        # 获取当前状态
-        current_duration = getattr(self, '_last_duration', 0.0)
-        current_ratio = current_duration / target_duration if target_duration > 0 else 999.0
-        original_text = segment['translated_text']
-        original_char_count = len(original_text)
-        
-        # 计算目标字符数（基于比例）
-        target_char_count = int(original_char_count / current_ratio) if current_ratio > 1.0 else original_char_count
-        
-        self.logger.log_alignment_step(
-            segment_id, 2, "文本优化", 
-            f"当前声音时长: {current_duration:.2f}s, 目标时长: {target_duration:.2f}s, "
-            f"当前比例: {current_ratio:.2f}, 比例<1: {current_ratio < 1.0}, "
-            f"下一步措施: 调用LLM优化文本 - 原文本字符数: {original_char_count}, 目标字符数: {target_char_count}"
-        )
-        
-        # 调用翻译优化服务
-        optimize_result = self.translation_service.optimize_translation(
-            segment.get('original_text', ''),
-            original_text,
-            current_duration,
-            target_duration,
-            self.config.target_language
-        )
-        
-        if not optimize_result["success"]:
-            self.logger.log_alignment_step(
-                segment_id, 2, "文本优化", f"LLM优化失败: {optimize_result['error']}"
-            )
-            return {"success": False, "error": optimize_result['error'], "step": 2}
-        
-        optimized_text = optimize_result["optimized_text"]
-        final_char_count = len(optimized_text)
-        optimization_trace_id = optimize_result.get("trace_id", "")
-        
-        # 打印详细的优化结果
-        self.logger.log_alignment_step(
-            segment_id, 2, "文本优化", 
-            f"LLM优化完成 - Trace-ID: {optimization_trace_id}, "
-            f"原文本字符数: {original_char_count}, 目标字符数: {target_char_count}, "
-            f"最终返回字符数: {final_char_count}, 压缩比例: {final_char_count/original_char_count:.2f}"
-        )
-        
-        # 用优化后的文本重新生成TTS
-        tts_result = self.tts_service.synthesize_speech(
-            optimized_text,
-            segment['voice_id'],
-            1.0,
-            f"./temp/segment_{segment_id}_step2.mp3"
-        )
-        
-        if not tts_result["success"]:
-            self.logger.log_alignment_step(
-                segment_id, 2, "文本优化", f"优化后TTS生成失败: {tts_result['error']}"
-            )
-            return {"success": False, "error": tts_result['error'], "step": 2}
-        
-        # 检查优化后的时长（去除静音）
-        actual_duration = self._get_trimmed_duration(tts_result["audio_path"], segment_id, "step2")
-        new_ratio = actual_duration / target_duration if target_duration > 0 else 999.0
-        
-        self.logger.log_alignment_step(
-            segment_id, 2, "文本优化", 
-            f"TTS生成后 - 当前声音时长: {actual_duration:.2f}s, 目标时长: {target_duration:.2f}s, "
-            f"当前比例: {new_ratio:.2f}, 比例<1: {new_ratio < 1.0}, "
-            f"下一步措施: {'成功' if new_ratio <= 1.0 else '需要速度调整'}"
-        )
-        
-        if new_ratio <= 1.0:
-            self.logger.log_alignment_step(
-                segment_id, 2, "文本优化",
-                f"成功! 优化后时长{actual_duration:.2f}s ≤ 目标时长{target_duration:.2f}s",
-                {
-                    "original_text": original_text,
-                    "optimized_text": optimized_text,
-                    "actual_duration": actual_duration,
-                    "char_reduction": f"{original_char_count} → {final_char_count}"
-                }
-            )
-            
-            return {
-                "success": True,
-                "step": 2,
-                "audio_path": tts_result["audio_path"],
-                "duration": actual_duration,
-                "speed": 1.0,
-                "optimized_text": optimized_text,
-                "optimization_trace_id": optimization_trace_id,
-                "tts_trace_id": tts_result.get("trace_id"),
-                "ratio": round(new_ratio, 2)
-            }
-        else:
-            self.logger.log_alignment_step(
-                segment_id, 2, "文本优化",
-                f"仍然超时: 优化后时长{actual_duration:.2f}s > 目标时长{target_duration:.2f}s, 进入速度调整"
-            )
-        
-        # 存储信息供下一步使用
-        self._last_duration = actual_duration
-        self._last_optimized_text = optimized_text
-        
-        return {
-            "success": False, 
-            "step": 2, 
-            "actual_duration": actual_duration,
-            "optimized_text": optimized_text,
-            "audio_path": tts_result["audio_path"]
-        }
-    
-    def _step3_speed_adjustment(self, segment: Dict[str, Any], target_duration: float) -> Dict[str, Any]:
-        """第三步：首次速度调整"""
-        segment_id = segment.get('sequence', 0)
-        
-        # 获取上一步的结果
-        current_duration = getattr(self, '_last_duration', len(segment['translated_text']) * 0.15)
-        current_ratio = current_duration / target_duration if target_duration > 0 else 999.0
-        optimized_text = getattr(self, '_last_optimized_text', segment['translated_text'])
-        
-        # 计算需要的速度，保留2位小数
-        speed = round(min(2.0, current_duration / target_duration + 0.2), 2)
-        
-        self.logger.log_alignment_step(
-            segment_id, 3, "首次速度调整",
-            f"当前声音时长: {current_duration:.2f}s, 目标时长: {target_duration:.2f}s, "
-            f"当前比例: {current_ratio:.2f}, 比例<1: {current_ratio < 1.0}, "
-            f"下一步措施: 速度调整到{speed:.1f}倍"
-        )
-        
-        # 使用速度参数重新生成TTS
-        tts_result = self.tts_service.synthesize_speech(
-            optimized_text,
-            segment['voice_id'],
-            speed,
-            f"./temp/segment_{segment_id}_step3.mp3"
-        )
-        
-        if not tts_result["success"]:
-            self.logger.log_alignment_step(
-                segment_id, 3, "首次速度调整", f"加速TTS生成失败: {tts_result['error']}"
-            )
-            return {"success": False, "error": tts_result['error'], "step": 3}
-        
-        actual_duration = self._get_trimmed_duration(tts_result["audio_path"], segment_id, "step3")
-        new_ratio = actual_duration / target_duration if target_duration > 0 else 999.0
-        
-        self.logger.log_alignment_step(
-            segment_id, 3, "首次速度调整",
-            f"速度调整后 - 当前声音时长: {actual_duration:.2f}s, 目标时长: {target_duration:.2f}s, "
-            f"当前比例: {new_ratio:.2f}, 比例<1: {new_ratio < 1.0}, "
-            f"下一步措施: {'成功' if new_ratio <= 1.0 else '需要更高速度'}"
-        )
-        
-        if new_ratio <= 1.0:
-            self.logger.log_alignment_step(
-                segment_id, 3, "首次速度调整",
-                f"成功! 加速后时长{actual_duration:.2f}s ≤ 目标时长{target_duration:.2f}s"
-            )
-            
-            return {
-                "success": True,
-                "step": 3,
-                "audio_path": tts_result["audio_path"],
-                "duration": actual_duration,
-                "speed": speed,
-                "optimized_text": optimized_text,
-                "trace_id": tts_result.get("trace_id"),
-                "ratio": round(new_ratio, 2)
-            }
-        else:
-            self.logger.log_alignment_step(
-                segment_id, 3, "首次速度调整",
-                f"仍然超时: 加速后时长{actual_duration:.2f}s > 目标时长{target_duration:.2f}s, 进入递增重试"
-            )
-        
-        # 存储信息供下一步使用
-        self._last_speed = round(speed, 2)
-        self._last_duration = actual_duration
-        
-        return {"success": False, "step": 3, "actual_duration": actual_duration, "speed": speed}
-    
-    def _step4_speed_retry(self, segment: Dict[str, Any], target_duration: float) -> Dict[str, Any]:
-        """第四步：速度递增重试"""
-        segment_id = segment.get('sequence', 0)
-        
-        # 获取上一步的结果
-        last_speed = getattr(self, '_last_speed', 1.5)
-        current_duration = getattr(self, '_last_duration', 0.0)
-        current_ratio = current_duration / target_duration if target_duration > 0 else 999.0
-        optimized_text = getattr(self, '_last_optimized_text', segment['translated_text'])
-        
-        # 递增速度重试
-        speeds_to_try = [round(last_speed + 0.5, 2), 2.0]
-        
-        self.logger.log_alignment_step(
-            segment_id, 4, "速度递增重试",
-            f"当前声音时长: {current_duration:.2f}s, 目标时长: {target_duration:.2f}s, "
-            f"当前比例: {current_ratio:.2f}, 比例<1: {current_ratio < 1.0}, "
-            f"下一步措施: 尝试更高速度 {speeds_to_try}"
-        )
-        
-        for speed in speeds_to_try:
-            if speed > 2.0:
-                speed = 2.0
-            speed = round(speed, 2)
-                
-            self.logger.log_alignment_step(
-                segment_id, 4, "速度递增重试",
-                f"尝试速度参数: {speed:.1f}"
-            )
-            
-            tts_result = self.tts_service.synthesize_speech(
-                optimized_text,
-                segment['voice_id'],
-                speed,
-                f"./temp/segment_{segment_id}_step4_{speed:.1f}.mp3"
-            )
-            
-            if tts_result["success"]:
-                actual_duration = self._get_trimmed_duration(tts_result["audio_path"], segment_id, f"step4_{speed:.1f}")
-                new_ratio = actual_duration / target_duration if target_duration > 0 else 999.0
-                
-                self.logger.log_alignment_step(
-                    segment_id, 4, "速度递增重试",
-                    f"速度{speed:.1f}测试 - 当前声音时长: {actual_duration:.2f}s, 目标时长: {target_duration:.2f}s, "
-                    f"当前比例: {new_ratio:.2f}, 比例<1: {new_ratio < 1.0}, "
-                    f"下一步措施: {'成功' if new_ratio <= 1.0 else '继续尝试更高速度'}"
-                )
-                
-                if new_ratio <= 1.0:
-                    self.logger.log_alignment_step(
-                        segment_id, 4, "速度递增重试",
-                        f"成功! 速度{speed:.1f}时长{actual_duration:.2f}s ≤ 目标时长{target_duration:.2f}s"
-                    )
-                    
-                    return {
-                        "success": True,
-                        "step": 4,
-                        "audio_path": tts_result["audio_path"],
-                        "duration": actual_duration,
-                        "speed": speed,
-                        "optimized_text": optimized_text,
-                        "trace_id": tts_result.get("trace_id"),
-                        "ratio": round(new_ratio, 2)
-                    }
-                else:
-                    # 保存最后一次尝试的时长供step 5使用
-                    self._last_duration = actual_duration
-        
-        # 获取最后一次尝试的实际时长（去除静音后）
-        last_duration = getattr(self, '_last_duration', current_duration)
-        last_ratio = last_duration / target_duration if target_duration > 0 else 999.0
-        
-        self.logger.log_alignment_step(
-            segment_id, 4, "速度递增重试", 
-            f"所有速度尝试均失败 - 当前声音时长: {last_duration:.2f}s, 目标时长: {target_duration:.2f}s, "
-            f"当前比例: {last_ratio:.2f}, 比例<1: {last_ratio < 1.0}, "
-            f"下一步措施: 设为静音"
-        )
-        
-        return {"success": False, "step": 4}
-    
-    def _step5_failure_handling(self, segment: Dict[str, Any], target_duration: float) -> Dict[str, Any]:
-        """第五步：失败处理（设为静音）"""
-        segment_id = segment.get('sequence', 0)
-        
-        current_duration = getattr(self, '_last_duration', 0.0)
-        current_ratio = current_duration / target_duration if target_duration > 0 else 999.0
-        
-        self.logger.log_alignment_step(
-            segment_id, 5, "失败处理",
-            f"当前声音时长: {current_duration:.2f}s, 目标时长: {target_duration:.2f}s, "
-            f"当前比例: {current_ratio:.2f}, 比例<1: {current_ratio < 1.0}, "
-            f"下一步措施: 所有优化步骤失败，设置为静音（时长: {target_duration:.2f}s）"
-        )
-        
-        # 生成静音音频文件
-        silence_path = f"./temp/segment_{segment_id}_silence.mp3"
-        silence_result = self._generate_silence_audio(target_duration, silence_path)
-        
-        if silence_result["success"]:
-            self.logger.log_alignment_step(
-                segment_id, 5, "失败处理",
-                f"静音生成成功 - 当前声音时长: 0.0s, 目标时长: {target_duration:.2f}s, "
-                f"当前比例: 0.0, 比例<1: True, 下一步措施: 完成"
-            )
-            
-            return {
-                "success": True,
-                "step": 5,
-                "audio_path": silence_path,
-                "duration": target_duration,
-                "speed": 1.0,
-                "optimized_text": "",
-                "is_silence": True
-            }
-        else:
-            return {
-                "success": False,
-                "step": 5,
-                "error": "静音音频生成失败"
-            }
-    
-    def _generate_silence_audio(self, duration: float, output_path: str) -> Dict[str, Any]:
-        """生成指定时长的静音音频"""
-        try:
-            import numpy as np
-            import soundfile as sf
-            
-            # 生成静音数据
-            sample_rate = 44100
-            samples = int(duration * sample_rate)
-            silence = np.zeros(samples, dtype=np.float32)
-            
-            # 保存为音频文件
-            sf.write(output_path, silence, sample_rate)
-            
-            return {"success": True, "file_path": output_path}
-            
-        except ImportError:
-            # 如果没有soundfile，使用ffmpeg
-            try:
-                import subprocess
-                cmd = [
-                    'ffmpeg', '-f', 'lavfi', '-i', f'anullsrc=duration={duration}',
-                    '-c:a', 'mp3', '-y', output_path
-                ]
-                result = subprocess.run(cmd, capture_output=True)
-                
-                if result.returncode == 0:
-                    return {"success": True, "file_path": output_path}
-                else:
-                    return {"success": False, "error": "ffmpeg生成静音失败"}
-                    
-            except Exception as e:
-                return {"success": False, "error": f"静音生成异常: {str(e)}"}
-        except Exception as e:
-            return {"success": False, "error": f"静音生成异常: {str(e)}"}
-    
-    def batch_optimize(self, segments: list) -> list:
-        """批量优化多个片段"""
-        results = []
-        
-        for i, segment in enumerate(segments):
-            self.logger.log("INFO", f"正在优化第{i+1}/{len(segments)}个片段...")
-            
-            # 解析时间戳获取目标时长
-            timestamp = segment.get('timestamp', '0-3')
-            start_time, end_time = self._parse_timestamp(timestamp)
-            target_duration = end_time - start_time
-            
-            result = self.optimize_segment(segment, target_duration)
-            result['segment_id'] = segment.get('sequence', i)
-            results.append(result)
-            
-            # 批量处理时添加小延迟
-            time.sleep(0.5)
-                
-        return results
-    
-    def _parse_timestamp(self, timestamp: str) -> Tuple[float, float]:
-        """解析时间戳"""
-        try:
-            parts = timestamp.split('-')
-            if len(parts) == 2:
-                start = float(parts[0])
-                end = float(parts[1])
-                return start, end
-        except:
-            pass
-        return 0.0, 3.0  # 默认值
\ No newline at end of file
+import asyncio
+import os
+import re
+import subprocess
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, asdict, replace
+from typing import Dict, Any, Optional, Tuple
+from uuid import uuid4
+
+# 时间戳格式固定为"起始-结束"，预编译正则避免每次split+异常兜底的开销
+_TS_RE = re.compile(r'^([\d.]+)-([\d.]+)$')
+
+def _run_ffmpeg(cmd: list, input_bytes: bytes = None) -> subprocess.CompletedProcess:
+    """执行一次ffmpeg调用（在共享线程池中运行，子进程本身不占GIL）"""
+    return subprocess.run(cmd, input=input_bytes, capture_output=True)
+
+@dataclass(slots=True)
+class StepContext:
+    """步骤间显式传递的片段级状态，取代实例上的共享_last_*属性"""
+    current_duration: float = 0.0
+    optimized_text: str = ""
+    last_speed: float = 1.5
+    last_audio_path: Optional[str] = None
+
+@dataclass(slots=True)
+class StepResult:
+    """5步对齐优化的单步结果"""
+    success: bool
+    step: int
+    audio_path: str = ""
+    duration: float = 0.0
+    speed: float = 1.0
+    optimized_text: str = ""
+    ratio: float = 0.0
+    error: Optional[str] = None
+    trace_id: Optional[str] = None
+    optimization_trace_id: Optional[str] = None
+    is_silence: bool = False
+
+class AlignmentOptimizer:
+    def __init__(self, config, translation_service, tts_service, logger_service):
+        self.config = config
+        self.translation_service = translation_service
+        self.tts_service = tts_service
+        self.logger = logger_service
+        self._temp_dir = getattr(config, 'temp_dir', None) or "./temp"
+        # 临时目录只创建一次，避免每次写文件前的makedirs调用
+        os.makedirs(self._temp_dir, exist_ok=True)
+        # 缓存路径模板，热路径里只做一次格式化
+        self._step4_tmpl = os.path.join(self._temp_dir, "segment_{}_{}_step4_{:.1f}.mp3")
+        self._trimmed_tmpl = os.path.join(self._temp_dir, "segment_{}_{}_{}_trimmed.mp3")
+        # 音频时长缓存，键为 (路径, mtime, size)，文件变化后自动失效
+        self._duration_cache: Dict[Tuple[str, int, int], float] = {}
+        # 共享ffmpeg工作池：批量优化时多个静音/裁剪任务可并发执行
+        self._ffmpeg_pool: Optional[ThreadPoolExecutor] = None
+        # 每语言的 (字符数, 实测时长) 观测缓冲与线性模型，用于校准时长估算
+        self._duration_obs: Dict[str, deque] = {}
+        self._duration_model: Dict[str, Tuple[float, float]] = {}
+        self._obs_since_fit: Dict[str, int] = {}
+
+    def _record_duration_observation(self, text: str, duration: float) -> None:
+        """记录一次速度1.0下的(字符数, 实测时长)观测，定期重拟合线性模型"""
+        if not text or duration <= 0:
+            return
+
+        lang = getattr(self.config, 'target_language', '') or ''
+        buffer = self._duration_obs.get(lang)
+        if buffer is None:
+            buffer = self._duration_obs[lang] = deque(maxlen=100)
+        buffer.append((len(text), duration))
+
+        # 每10个新观测重拟合一次，摊薄拟合成本
+        count = self._obs_since_fit.get(lang, 0) + 1
+        if count >= 10 and len(buffer) >= 8:
+            self._refit_duration_model(lang, buffer)
+            count = 0
+        self._obs_since_fit[lang] = count
+
+    def _refit_duration_model(self, lang: str, buffer: deque) -> None:
+        """对观测缓冲做最小二乘拟合 duration ≈ slope*chars + intercept"""
+        n = len(buffer)
+        sx = sum(c for c, _ in buffer)
+        sy = sum(d for _, d in buffer)
+        sxx = sum(c * c for c, _ in buffer)
+        sxy = sum(c * d for c, d in buffer)
+
+        denom = n * sxx - sx * sx
+        if denom <= 0:
+            return
+
+        slope = (n * sxy - sx * sy) / denom
+        intercept = (sy - slope * sx) / n
+        if slope > 0:
+            self._duration_model[lang] = (slope, intercept)
+
+    def _estimate_duration(self, text: str) -> float:
+        """估算文本的TTS时长；有校准模型时用线性拟合，否则用0.15s/字经验值"""
+        lang = getattr(self.config, 'target_language', '') or ''
+        model = self._duration_model.get(lang)
+        if model is not None:
+            slope, intercept = model
+            return max(0.0, slope * len(text) + intercept)
+        return len(text) * 0.15
+
+    def _submit_ffmpeg(self, cmd: list, input_bytes: bytes = None) -> subprocess.CompletedProcess:
+        """在共享工作池中执行ffmpeg，避免每次调用都阻塞当前线程"""
+        if self._ffmpeg_pool is None:
+            self._ffmpeg_pool = ThreadPoolExecutor(
+                max_workers=os.cpu_count() or 2,
+                thread_name_prefix="ffmpeg"
+            )
+        return self._ffmpeg_pool.submit(_run_ffmpeg, cmd, input_bytes).result()
+
+    @staticmethod
+    def _ratio_of(duration: float, inv_target: Optional[float]) -> float:
+        """时长与目标时长的比例；目标时长无效时返回999.0哨兵值"""
+        return duration * inv_target if inv_target is not None else 999.0
+
+    def _cached_duration(self, audio_path: str, st: os.stat_result) -> float:
+        """按 (路径, mtime, size) 缓存音频时长，避免重复探测同一文件"""
+        key = (audio_path, st.st_mtime_ns, st.st_size)
+        duration = self._duration_cache.get(key)
+        if duration is None:
+            duration = self.tts_service.get_audio_duration(audio_path)
+            self._duration_cache[key] = duration
+        return duration
+
+    def _paths_for(self, segment_id: int) -> Dict[str, str]:
+        """预生成该片段各步骤的临时文件路径，避免每步重复拼接
+
+        路径中带一次性随机标记，批量并行优化同一片段时不会互相覆盖。
+        """
+        tag = uuid4().hex[:8]
+        prefix = os.path.join(self._temp_dir, f"segment_{segment_id}_{tag}")
+        return {
+            "tag": tag,
+            "step1": f"{prefix}_step1.mp3",
+            "step1_trimmed": f"{prefix}_step1_trimmed.mp3",
+            "step2": f"{prefix}_step2.mp3",
+            "step3": f"{prefix}_step3.mp3",
+            "silence": f"{prefix}_silence.mp3",
+        }
+
+    def _apply_atempo(self, input_path: str, output_path: str, speed: float) -> Optional[float]:
+        """用ffmpeg atempo对已有音频本地变速，成功时返回变速后时长"""
+        tmp_path = output_path + ".tmp"
+        result = self._submit_ffmpeg([
+            'ffmpeg', '-y', '-i', input_path,
+            '-filter:a', f'atempo={speed}', '-f', 'mp3', tmp_path
+        ])
+
+        if result.returncode != 0:
+            return None
+
+        os.replace(tmp_path, output_path)
+        return self.tts_service.get_audio_duration(output_path)
+
+    def _get_trimmed_duration(self, audio_path: str, segment_id: int, tag: str, step: str) -> Tuple[str, float]:
+        """获取去除静音后的音频路径和时长"""
+        # 先尝试静音裁剪
+        trimmed_path = self._trimmed_tmpl.format(segment_id, tag, step)
+        trim_result = self.tts_service.trim_silence(audio_path, trimmed_path)
+
+        if trim_result["success"]:
+            trimmed_duration = trim_result["trimmed_duration"]
+            self.logger.log("DEBUG", f"音频静音裁剪成功: {audio_path} -> {trimmed_duration:.2f}s")
+            return trim_result["output_path"], trimmed_duration
+        else:
+            # 如果裁剪失败，使用原始路径和时长
+            original_duration = self.tts_service.get_audio_duration(audio_path)
+            self.logger.log("WARNING", f"音频静音裁剪失败，使用原始时长: {original_duration:.2f}s")
+            return audio_path, original_duration
+
+    def optimize_segment(self, segment: Dict[str, Any], target_duration: float) -> StepResult:
+        """5步时间戳对齐优化算法"""
+        segment_id = segment.get('sequence', 0)
+        original_text = segment.get('original_text', '')
+        translated_text = segment.get('translated_text', '')
+        voice_id = segment.get('voice_id', '')
+
+        self.logger.log("INFO", f"开始第{segment_id}句5步时间戳对齐优化...")
+
+        # 为该片段一次性准备好各步骤输出路径和倒数目标时长
+        paths = self._paths_for(segment_id)
+        inv_target = (1.0 / target_duration) if target_duration > 0 else None
+        ctx = StepContext()
+
+        # 第一步：静音裁剪检查
+        step1_result = self._step1_silence_trimming(segment, target_duration, paths, inv_target, ctx)
+        if step1_result.success:
+            return step1_result
+
+        # 快速通道：轻度超时时LLM文本优化收益有限，直接速度调整即可达标
+        current_duration = step1_result.duration
+        current_ratio = self._ratio_of(current_duration, inv_target)
+        skip_llm_ratio = getattr(self.config, 'skip_llm_ratio', 1.3)
+
+        if not step1_result.error and 1.0 < current_ratio <= skip_llm_ratio:
+            self.logger.log(
+                "INFO",
+                f"第{segment_id}句比例{current_ratio:.2f} ≤ 阈值{skip_llm_ratio}，跳过文本优化直接速度调整"
+            )
+            step3_result = self._step3_speed_adjustment(segment, target_duration, paths, inv_target, ctx)
+            if step3_result.success:
+                return step3_result
+
+            step4_result = self._step4_speed_retry(segment, target_duration, paths, inv_target, ctx)
+            if step4_result.success:
+                return step4_result
+
+            return self._step5_failure_handling(segment, target_duration, paths, inv_target, ctx)
+
+        # 第二步：文本优化
+        step2_result = self._step2_text_optimization(segment, target_duration, paths, inv_target, ctx)
+        if step2_result.success:
+            return step2_result
+
+        # 第三步：首次速度调整
+        step3_result = self._step3_speed_adjustment(segment, target_duration, paths, inv_target, ctx)
+        if step3_result.success:
+            return step3_result
+
+        # 第四步：速度递增重试
+        step4_result = self._step4_speed_retry(segment, target_duration, paths, inv_target, ctx)
+        if step4_result.success:
+            return step4_result
+
+        # 第五步：失败处理（静音）
+        step5_result = self._step5_failure_handling(segment, target_duration, paths, inv_target, ctx)
+        return step5_result
+
+    async def optimize_segment_async(self, segment: Dict[str, Any], target_duration: float) -> StepResult:
+        """optimize_segment的异步变体：第二步LLM优化与推测性加速TTS并发执行
+
+        同步服务调用通过asyncio.to_thread跑在线程池里，无需引入异步HTTP依赖。
+        LLM优化耗时1~2s，期间先用当前文本推测性地做一次加速TTS：
+        若第二步失败或优化后文本仍超时，推测结果可以直接兜底，省掉一轮TTS往返。
+        """
+        segment_id = segment.get('sequence', 0)
+
+        self.logger.log("INFO", f"开始第{segment_id}句5步时间戳对齐优化(异步)...")
+
+        paths = self._paths_for(segment_id)
+        inv_target = (1.0 / target_duration) if target_duration > 0 else None
+        ctx = StepContext()
+
+        step1_result = await asyncio.to_thread(
+            self._step1_silence_trimming, segment, target_duration, paths, inv_target, ctx
+        )
+        if step1_result.success:
+            return step1_result
+
+        current_duration = step1_result.duration
+        current_ratio = self._ratio_of(current_duration, inv_target)
+        skip_llm_ratio = getattr(self.config, 'skip_llm_ratio', 1.3)
+
+        # 快速通道与同步版一致：轻度超时直接速度调整
+        if not step1_result.error and 1.0 < current_ratio <= skip_llm_ratio:
+            self.logger.log(
+                "INFO",
+                f"第{segment_id}句比例{current_ratio:.2f} ≤ 阈值{skip_llm_ratio}，跳过文本优化直接速度调整"
+            )
+            step3_result = await asyncio.to_thread(
+                self._step3_speed_adjustment, segment, target_duration, paths, inv_target, ctx
+            )
+            if step3_result.success:
+                return step3_result
+
+            step4_result = await asyncio.to_thread(
+                self._step4_speed_retry, segment, target_duration, paths, inv_target, ctx
+            )
+            if step4_result.success:
+                return step4_result
+
+            return await asyncio.to_thread(
+                self._step5_failure_handling, segment, target_duration, paths, inv_target, ctx
+            )
+
+        # 并发执行：第二步文本优化 + 推测性的第三步速度调整
+        # 推测任务拿到的是第一步状态的独立副本，与第二步在各自线程里
+        # 互不共享可变状态，避免两边对ctx的并发读写
+        speculative_ctx = replace(ctx)
+        step2_task = asyncio.create_task(asyncio.to_thread(
+            self._step2_text_optimization, segment, target_duration, paths, inv_target, ctx
+        ))
+        speculative_task = asyncio.create_task(asyncio.to_thread(
+            self._step3_speed_adjustment, segment, target_duration, paths, inv_target, speculative_ctx
+        ))
+
+        step2_result = await step2_task
+        if step2_result.success:
+            # 文本优化已达标，推测结果不再需要（线程已运行时仅丢弃结果）
+            speculative_task.cancel()
+            return step2_result
+
+        speculative_result = await speculative_task
+        if speculative_result.success:
+            self.logger.log(
+                "INFO", f"第{segment_id}句文本优化未达标，采用推测性加速TTS结果"
+            )
+            return speculative_result
+
+        # 推测结果也未达标：显式用第二步结果重置共享状态后，
+        # 按原流程用优化后文本继续第三/四/五步
+        if step2_result.duration > 0:
+            ctx.current_duration = step2_result.duration
+        if step2_result.optimized_text:
+            ctx.optimized_text = step2_result.optimized_text
+        if step2_result.audio_path:
+            ctx.last_audio_path = step2_result.audio_path
+
+        step3_result = await asyncio.to_thread(
+            self._step3_speed_adjustment, segment, target_duration, paths, inv_target, ctx
+        )
+        if step3_result.success:
+            return step3_result
+
+        step4_result = await asyncio.to_thread(
+            self._step4_speed_retry, segment, target_duration, paths, inv_target, ctx
+        )
+        if step4_result.success:
+            return step4_result
+
+        return await asyncio.to_thread(
+            self._step5_failure_handling, segment, target_duration, paths, inv_target, ctx
+        )
+
+    def _step1_silence_trimming(self, segment: Dict[str, Any], target_duration: float, paths: Dict[str, str], inv_target: Optional[float], ctx: StepContext) -> StepResult:
+        """第一步：状态分析和静音裁剪检查"""
+        segment_id = segment.get('sequence', 0)
+
+        # 检查是否已有翻译音频文件
+        existing_audio_path = segment.get('translated_audio_path')
+        current_duration = 0.0
+        ratio = 0.0
+
+        # 只stat一次，既当存在性检查又为时长缓存提供键
+        existing_stat = None
+        if existing_audio_path:
+            try:
+                existing_stat = os.stat(existing_audio_path)
+            except OSError:
+                existing_stat = None
+
+        already_trimmed = False
+
+        if existing_stat is not None:
+            # 获取现有音频时长
+            current_duration = self._cached_duration(existing_audio_path, existing_stat)
+            ratio = self._ratio_of(current_duration, inv_target)
+
+            self.logger.log_alignment_step(
+                segment_id, 1, "状态分析",
+                f"当前声音时长: {current_duration:.2f}s, 目标时长: {target_duration:.2f}s, "
+                f"当前比例: {ratio:.2f}, 比例<1: {ratio < 1.0}, 下一步措施: {'直接使用' if ratio <= 1.0 else '需要优化'}"
+            )
+
+            # 如果比例小于等于1，说明时长合适，直接使用
+            if ratio <= 1.0:
+                self.logger.log_alignment_step(
+                    segment_id, 1, "状态分析",
+                    f"成功! 现有音频时长{current_duration:.2f}s ≤ 目标时长{target_duration:.2f}s，直接使用",
+                    {"current_duration": current_duration, "target_duration": target_duration}
+                )
+
+                return StepResult(
+                    success=True,
+                    step=1,
+                    audio_path=existing_audio_path,
+                    duration=current_duration,
+                    speed=1.0,
+                    optimized_text=segment['translated_text'],
+                    ratio=round(ratio, 2)
+                )
+        else:
+            # 没有现有音频，需要先生成
+            estimated_duration = self._estimate_duration(segment.get('translated_text', ''))
+            ratio = self._ratio_of(estimated_duration, inv_target)
+
+            self.logger.log_alignment_step(
+                segment_id, 1, "状态分析",
+                f"当前声音时长: 无现有音频(估算{estimated_duration:.2f}s), 目标时长: {target_duration:.2f}s, "
+                f"当前比例: {ratio:.2f}, 比例<1: {ratio < 1.0}, 下一步措施: 生成TTS音频"
+            )
+
+            # 估算已明显超时（>1.3×目标）的文本，速度1.0合成必然白费，
+            # 跳过这次TTS直接进入第二步文本精简
+            if ratio > 1.3:
+                ctx.current_duration = estimated_duration
+                self.logger.log_alignment_step(
+                    segment_id, 1, "静音裁剪检查",
+                    f"估算时长{estimated_duration:.2f}s 超出目标时长{target_duration:.2f}s的1.3倍，"
+                    f"跳过初始合成，直接进入文本优化"
+                )
+                return StepResult(success=False, step=1, duration=estimated_duration)
+
+            # 生成初始TTS音频
+            tts_result = self.tts_service.synthesize_speech(
+                segment['translated_text'],
+                segment['voice_id'],
+                1.0,
+                paths["step1"]
+            )
+
+            if not tts_result["success"]:
+                self.logger.log_alignment_step(
+                    segment_id, 1, "静音裁剪检查", f"TTS生成失败: {tts_result['error']}"
+                )
+                return StepResult(success=False, step=1, error=tts_result['error'])
+
+            trimmed_path, current_duration = self._get_trimmed_duration(tts_result["audio_path"], segment_id, paths["tag"], "step1")
+            self._record_duration_observation(segment['translated_text'], current_duration)
+            ratio = self._ratio_of(current_duration, inv_target)
+
+            self.logger.log_alignment_step(
+                segment_id, 1, "状态分析",
+                f"TTS生成后 - 当前声音时长: {current_duration:.2f}s, 目标时长: {target_duration:.2f}s, "
+                f"当前比例: {ratio:.2f}, 比例<1: {ratio < 1.0}, 下一步措施: {'静音裁剪检查' if ratio > 1.0 else '直接使用'}"
+            )
+
+            if ratio <= 1.0:
+                self.logger.log_alignment_step(
+                    segment_id, 1, "静音裁剪检查",
+                    f"成功! 生成音频时长{current_duration:.2f}s ≤ 目标时长{target_duration:.2f}s",
+                    {"current_duration": current_duration, "target_duration": target_duration}
+                )
+
+                return StepResult(
+                    success=True,
+                    step=1,
+                    audio_path=trimmed_path,
+                    duration=current_duration,
+                    speed=1.0,
+                    optimized_text=segment['translated_text'],
+                    trace_id=tts_result.get("trace_id"),
+                    ratio=round(ratio, 2)
+                )
+
+            # 刚生成的音频在上面已裁剪过，直接沿用裁剪结果
+            existing_audio_path = trimmed_path
+            already_trimmed = True
+
+        # 如果到这里，说明音频时长超过目标，尝试静音裁剪（已裁剪过则不再重复）
+        if not already_trimmed:
+            self.logger.log_alignment_step(
+                segment_id, 1, "静音裁剪检查",
+                f"音频超时，尝试静音裁剪: {current_duration:.2f}s > {target_duration:.2f}s"
+            )
+
+            trim_result = self.tts_service.trim_silence(
+                existing_audio_path,
+                paths["step1_trimmed"]
+            )
+        else:
+            self.logger.log_alignment_step(
+                segment_id, 1, "静音裁剪检查",
+                f"音频已在生成后裁剪过({current_duration:.2f}s)，跳过重复裁剪"
+            )
+            trim_result = {"success": False}
+
+        if trim_result["success"]:
+            trimmed_duration = trim_result["trimmed_duration"]
+            new_ratio = self._ratio_of(trimmed_duration, inv_target)
+
+            self.logger.log_alignment_step(
+                segment_id, 1, "静音裁剪检查",
+                f"裁剪后 - 当前声音时长: {trimmed_duration:.2f}s, 目标时长: {target_duration:.2f}s, "
+                f"当前比例: {new_ratio:.2f}, 比例<1: {new_ratio < 1.0}, 下一步措施: {'成功' if new_ratio <= 1.0 else '需要文本优化'}"
+            )
+
+            if new_ratio <= 1.0:
+                self.logger.log_alignment_step(
+                    segment_id, 1, "静音裁剪检查",
+                    f"成功! 裁剪后时长{trimmed_duration:.2f}s ≤ 目标时长{target_duration:.2f}s",
+                    {"trimmed_duration": trimmed_duration, "target_duration": target_duration}
+                )
+
+                return StepResult(
+                    success=True,
+                    step=1,
+                    audio_path=trim_result["output_path"],
+                    duration=trimmed_duration,
+                    speed=1.0,
+                    optimized_text=segment['translated_text'],
+                    ratio=round(new_ratio, 2)
+                )
+            else:
+                current_duration = trimmed_duration
+
+        # 记录失败信息供下一步使用
+        ctx.current_duration = current_duration
+        self.logger.log_alignment_step(
+            segment_id, 1, "静音裁剪检查",
+            f"失败: 裁剪后时长{current_duration:.2f}s > 目标时长{target_duration:.2f}s, 进入文本优化"
+        )
+
+        return StepResult(success=False, step=1, duration=current_duration)
+
+    def _step2_text_optimization(self, segment: Dict[str, Any], target_duration: float, paths: Dict[str, str], inv_target: Optional[float], ctx: StepContext) -> StepResult:
+        """第二步：文本优化"""
+        segment_id = segment.get('sequence', 0)
+
+        # 获取当前状态
+        current_duration = ctx.current_duration
+        current_ratio = self._ratio_of(current_duration, inv_target)
+        original_text = segment['translated_text']
+        original_char_count = len(original_text)
+
+        # 计算目标字符数（基于比例）
+        target_char_count = int(original_char_count / current_ratio) if current_ratio > 1.0 else original_char_count
+
+        self.logger.log_alignment_step(
+            segment_id, 2, "文本优化",
+            f"当前声音时长: {current_duration:.2f}s, 目标时长: {target_duration:.2f}s, "
+            f"当前比例: {current_ratio:.2f}, 比例<1: {current_ratio < 1.0}, "
+            f"下一步措施: 调用LLM优化文本 - 原文本字符数: {original_char_count}, 目标字符数: {target_char_count}"
+        )
+
+        # 调用翻译优化服务
+        optimize_result = self.translation_service.optimize_translation(
+            segment.get('original_text', ''),
+            original_text,
+            current_duration,
+            target_duration,
+            self.config.target_language
+        )
+
+        if not optimize_result["success"]:
+            self.logger.log_alignment_step(
+                segment_id, 2, "文本优化", f"LLM优化失败: {optimize_result['error']}"
+            )
+            return StepResult(success=False, step=2, error=optimize_result['error'])
+
+        optimized_text = optimize_result["optimized_text"]
+        final_char_count = len(optimized_text)
+        optimization_trace_id = optimize_result.get("trace_id", "")
+
+        # 打印详细的优化结果
+        self.logger.log_alignment_step(
+            segment_id, 2, "文本优化",
+            f"LLM优化完成 - Trace-ID: {optimization_trace_id}, "
+            f"原文本字符数: {original_char_count}, 目标字符数: {target_char_count}, "
+            f"最终返回字符数: {final_char_count}, 压缩比例: {final_char_count/original_char_count:.2f}"
+        )
+
+        # 用优化后的文本重新生成TTS
+        tts_result = self.tts_service.synthesize_speech(
+            optimized_text,
+            segment['voice_id'],
+            1.0,
+            paths["step2"]
+        )
+
+        if not tts_result["success"]:
+            self.logger.log_alignment_step(
+                segment_id, 2, "文本优化", f"优化后TTS生成失败: {tts_result['error']}"
+            )
+            return StepResult(success=False, step=2, error=tts_result['error'])
+
+        # 检查优化后的时长（去除静音）
+        _, actual_duration = self._get_trimmed_duration(tts_result["audio_path"], segment_id, paths["tag"], "step2")
+        self._record_duration_observation(optimized_text, actual_duration)
+        new_ratio = self._ratio_of(actual_duration, inv_target)
+
+        self.logger.log_alignment_step(
+            segment_id, 2, "文本优化",
+            f"TTS生成后 - 当前声音时长: {actual_duration:.2f}s, 目标时长: {target_duration:.2f}s, "
+            f"当前比例: {new_ratio:.2f}, 比例<1: {new_ratio < 1.0}, "
+            f"下一步措施: {'成功' if new_ratio <= 1.0 else '需要速度调整'}"
+        )
+
+        if new_ratio <= 1.0:
+            self.logger.log_alignment_step(
+                segment_id, 2, "文本优化",
+                f"成功! 优化后时长{actual_duration:.2f}s ≤ 目标时长{target_duration:.2f}s",
+                {
+                    "original_text": original_text,
+                    "optimized_text": optimized_text,
+                    "actual_duration": actual_duration,
+                    "char_reduction": f"{original_char_count} → {final_char_count}"
+                }
+            )
+
+            return StepResult(
+                success=True,
+                step=2,
+                audio_path=tts_result["audio_path"],
+                duration=actual_duration,
+                speed=1.0,
+                optimized_text=optimized_text,
+                optimization_trace_id=optimization_trace_id,
+                trace_id=tts_result.get("trace_id"),
+                ratio=round(new_ratio, 2)
+            )
+        else:
+            self.logger.log_alignment_step(
+                segment_id, 2, "文本优化",
+                f"仍然超时: 优化后时长{actual_duration:.2f}s > 目标时长{target_duration:.2f}s, 进入速度调整"
+            )
+
+        # 存储信息供下一步使用
+        ctx.current_duration = actual_duration
+        ctx.optimized_text = optimized_text
+        ctx.last_audio_path = tts_result["audio_path"]
+
+        return StepResult(
+            success=False,
+            step=2,
+            duration=actual_duration,
+            optimized_text=optimized_text,
+            audio_path=tts_result["audio_path"]
+        )
+
+    def _step3_speed_adjustment(self, segment: Dict[str, Any], target_duration: float, paths: Dict[str, str], inv_target: Optional[float], ctx: StepContext) -> StepResult:
+        """第三步：首次速度调整"""
+        segment_id = segment.get('sequence', 0)
+
+        # 获取上一步的结果
+        current_duration = ctx.current_duration or self._estimate_duration(segment['translated_text'])
+        current_ratio = self._ratio_of(current_duration, inv_target)
+        optimized_text = ctx.optimized_text or segment['translated_text']
+
+        # 时长与速度近似成反比，直接按比例算出所需速度（留5%余量），保留2位小数
+        speed = round(min(2.0, current_ratio * 1.05), 2)
+
+        self.logger.log_alignment_step(
+            segment_id, 3, "首次速度调整",
+            f"当前声音时长: {current_duration:.2f}s, 目标时长: {target_duration:.2f}s, "
+            f"当前比例: {current_ratio:.2f}, 比例<1: {current_ratio < 1.0}, "
+            f"下一步措施: 速度调整到{speed:.1f}倍"
+        )
+
+        # 上一步已有合成音频时，直接用ffmpeg atempo本地变速，
+        # 省掉一次TTS网络往返（1.0~2.0倍变速质量足够）
+        if ctx.last_audio_path and os.path.exists(ctx.last_audio_path):
+            atempo_result = self._apply_atempo(
+                ctx.last_audio_path, paths["step3"], speed
+            )
+            if atempo_result is not None:
+                # 与其他验收点一致，用去静音后的时长参与比例判断
+                _, actual_duration = self._get_trimmed_duration(paths["step3"], segment_id, paths["tag"], "step3")
+                new_ratio = self._ratio_of(actual_duration, inv_target)
+
+                self.logger.log_alignment_step(
+                    segment_id, 3, "首次速度调整",
+                    f"本地变速后 - 当前声音时长: {actual_duration:.2f}s, 目标时长: {target_duration:.2f}s, "
+                    f"当前比例: {new_ratio:.2f}, 比例<1: {new_ratio < 1.0}, "
+                    f"下一步措施: {'成功' if new_ratio <= 1.0 else '需要更高速度'}"
+                )
+
+                if new_ratio <= 1.0:
+                    self.logger.log_alignment_step(
+                        segment_id, 3, "首次速度调整",
+                        f"成功! 本地变速后时长{actual_duration:.2f}s ≤ 目标时长{target_duration:.2f}s"
+                    )
+
+                    return StepResult(
+                        success=True,
+                        step=3,
+                        audio_path=paths["step3"],
+                        duration=actual_duration,
+                        speed=speed,
+                        optimized_text=optimized_text,
+                        ratio=round(new_ratio, 2)
+                    )
+
+                # 变速后仍超时，记录状态进入递增重试
+                ctx.last_speed = round(speed, 2)
+                ctx.current_duration = actual_duration
+
+                return StepResult(success=False, step=3, duration=actual_duration, speed=speed)
+
+            self.logger.log("WARNING", f"第{segment_id}句本地变速失败，回退到TTS重合成")
+
+        # 使用速度参数重新生成TTS
+        tts_result = self.tts_service.synthesize_speech(
+            optimized_text,
+            segment['voice_id'],
+            speed,
+            paths["step3"]
+        )
+
+        if not tts_result["success"]:
+            self.logger.log_alignment_step(
+                segment_id, 3, "首次速度调整", f"加速TTS生成失败: {tts_result['error']}"
+            )
+            return StepResult(success=False, step=3, error=tts_result['error'])
+
+        _, actual_duration = self._get_trimmed_duration(tts_result["audio_path"], segment_id, paths["tag"], "step3")
+        new_ratio = self._ratio_of(actual_duration, inv_target)
+
+        self.logger.log_alignment_step(
+            segment_id, 3, "首次速度调整",
+            f"速度调整后 - 当前声音时长: {actual_duration:.2f}s, 目标时长: {target_duration:.2f}s, "
+            f"当前比例: {new_ratio:.2f}, 比例<1: {new_ratio < 1.0}, "
+            f"下一步措施: {'成功' if new_ratio <= 1.0 else '需要更高速度'}"
+        )
+
+        if new_ratio <= 1.0:
+            self.logger.log_alignment_step(
+                segment_id, 3, "首次速度调整",
+                f"成功! 加速后时长{actual_duration:.2f}s ≤ 目标时长{target_duration:.2f}s"
+            )
+
+            return StepResult(
+                success=True,
+                step=3,
+                audio_path=tts_result["audio_path"],
+                duration=actual_duration,
+                speed=speed,
+                optimized_text=optimized_text,
+                trace_id=tts_result.get("trace_id"),
+                ratio=round(new_ratio, 2)
+            )
+        else:
+            self.logger.log_alignment_step(
+                segment_id, 3, "首次速度调整",
+                f"仍然超时: 加速后时长{actual_duration:.2f}s > 目标时长{target_duration:.2f}s, 进入递增重试"
+            )
+
+        # 存储信息供下一步使用
+        ctx.last_speed = round(speed, 2)
+        ctx.current_duration = actual_duration
+        ctx.last_audio_path = tts_result["audio_path"]
+
+        return StepResult(success=False, step=3, duration=actual_duration, speed=speed)
+
+    def _step4_speed_retry(self, segment: Dict[str, Any], target_duration: float, paths: Dict[str, str], inv_target: Optional[float], ctx: StepContext) -> StepResult:
+        """第四步：速度递增重试"""
+        segment_id = segment.get('sequence', 0)
+
+        # 获取上一步的结果
+        last_speed = ctx.last_speed
+        current_duration = ctx.current_duration
+        current_ratio = self._ratio_of(current_duration, inv_target)
+        optimized_text = ctx.optimized_text or segment['translated_text']
+
+        # 利用 d(speed) ≈ d(last) * last / speed 一次算出所需速度（留5%余量），
+        # 仅在仍然超时时才回退到最高速2.0
+        if inv_target is not None:
+            speed_needed = round(min(2.0, current_duration * last_speed * inv_target * 1.05), 2)
+        else:
+            speed_needed = 2.0
+        speeds_to_try = [speed_needed] if speed_needed >= 2.0 else [speed_needed, 2.0]
+
+        self.logger.log_alignment_step(
+            segment_id, 4, "速度递增重试",
+            f"当前声音时长: {current_duration:.2f}s, 目标时长: {target_duration:.2f}s, "
+            f"当前比例: {current_ratio:.2f}, 比例<1: {current_ratio < 1.0}, "
+            f"下一步措施: 尝试更高速度 {speeds_to_try}"
+        )
+
+        def _attempt(speed: float) -> StepResult:
+            """合成并检查单个候选速度"""
+            self.logger.log_alignment_step(
+                segment_id, 4, "速度递增重试",
+                f"尝试速度参数: {speed:.1f}"
+            )
+
+            tts_result = self.tts_service.synthesize_speech(
+                optimized_text,
+                segment['voice_id'],
+                speed,
+                self._step4_tmpl.format(segment_id, paths["tag"], speed)
+            )
+
+            if not tts_result["success"]:
+                return StepResult(success=False, step=4, speed=speed, error=tts_result['error'])
+
+            _, actual_duration = self._get_trimmed_duration(tts_result["audio_path"], segment_id, paths["tag"], f"step4_{speed:.1f}")
+            new_ratio = self._ratio_of(actual_duration, inv_target)
+
+            self.logger.log_alignment_step(
+                segment_id, 4, "速度递增重试",
+                f"速度{speed:.1f}测试 - 当前声音时长: {actual_duration:.2f}s, 目标时长: {target_duration:.2f}s, "
+                f"当前比例: {new_ratio:.2f}, 比例<1: {new_ratio < 1.0}, "
+                f"下一步措施: {'成功' if new_ratio <= 1.0 else '继续尝试更高速度'}"
+            )
+
+            if new_ratio <= 1.0:
+                self.logger.log_alignment_step(
+                    segment_id, 4, "速度递增重试",
+                    f"成功! 速度{speed:.1f}时长{actual_duration:.2f}s ≤ 目标时长{target_duration:.2f}s"
+                )
+
+                return StepResult(
+                    success=True,
+                    step=4,
+                    audio_path=tts_result["audio_path"],
+                    duration=actual_duration,
+                    speed=speed,
+                    optimized_text=optimized_text,
+                    trace_id=tts_result.get("trace_id"),
+                    ratio=round(new_ratio, 2)
+                )
+
+            return StepResult(success=False, step=4, duration=actual_duration, speed=speed)
+
+        if len(speeds_to_try) == 1:
+            attempt_result = _attempt(speeds_to_try[0])
+            if attempt_result.success:
+                return attempt_result
+            if attempt_result.duration:
+                # 保存最后一次尝试的时长供step 5使用
+                ctx.current_duration = attempt_result.duration
+        else:
+            # 候选速度并发合成，第一个达标的结果胜出
+            executor = ThreadPoolExecutor(max_workers=len(speeds_to_try), thread_name_prefix="step4")
+            try:
+                futures = [executor.submit(_attempt, speed) for speed in speeds_to_try]
+                winner = None
+                for future in as_completed(futures):
+                    attempt_result = future.result()
+                    if attempt_result.success and winner is None:
+                        winner = attempt_result
+                        break
+                    if attempt_result.duration:
+                        # 保存最后一次尝试的时长供step 5使用
+                        ctx.current_duration = attempt_result.duration
+                if winner is not None:
+                    return winner
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+        # 获取最后一次尝试的实际时长（去除静音后）
+        last_duration = ctx.current_duration or current_duration
+        last_ratio = self._ratio_of(last_duration, inv_target)
+
+        self.logger.log_alignment_step(
+            segment_id, 4, "速度递增重试",
+            f"所有速度尝试均失败 - 当前声音时长: {last_duration:.2f}s, 目标时长: {target_duration:.2f}s, "
+            f"当前比例: {last_ratio:.2f}, 比例<1: {last_ratio < 1.0}, "
+            f"下一步措施: 设为静音"
+        )
+
+        return StepResult(success=False, step=4)
+
+    def _step5_failure_handling(self, segment: Dict[str, Any], target_duration: float, paths: Dict[str, str], inv_target: Optional[float], ctx: StepContext) -> StepResult:
+        """第五步：失败处理（设为静音）"""
+        segment_id = segment.get('sequence', 0)
+
+        current_duration = ctx.current_duration
+        current_ratio = self._ratio_of(current_duration, inv_target)
+
+        self.logger.log_alignment_step(
+            segment_id, 5, "失败处理",
+            f"当前声音时长: {current_duration:.2f}s, 目标时长: {target_duration:.2f}s, "
+            f"当前比例: {current_ratio:.2f}, 比例<1: {current_ratio < 1.0}, "
+            f"下一步措施: 所有优化步骤失败，设置为静音（时长: {target_duration:.2f}s）"
+        )
+
+        # 生成静音音频文件
+        silence_path = paths["silence"]
+        silence_result = self._generate_silence_audio(target_duration, silence_path)
+
+        if silence_result["success"]:
+            self.logger.log_alignment_step(
+                segment_id, 5, "失败处理",
+                f"静音生成成功 - 当前声音时长: 0.0s, 目标时长: {target_duration:.2f}s, "
+                f"当前比例: 0.0, 比例<1: True, 下一步措施: 完成"
+            )
+
+            return StepResult(
+                success=True,
+                step=5,
+                audio_path=silence_path,
+                duration=target_duration,
+                speed=1.0,
+                optimized_text="",
+                is_silence=True
+            )
+        else:
+            return StepResult(success=False, step=5, error="静音音频生成失败")
+
+    def _ensure_silence_base(self) -> Optional[str]:
+        """首次调用时渲染1秒静音MP3，之后所有静音都由它拼出来，不再逐次编码"""
+        base_path = os.path.join(self._temp_dir, "_silence_1s.mp3")
+        if os.path.exists(base_path):
+            return base_path
+
+        pcm = b"\x00\x00" * 44100
+        tmp_path = base_path + ".tmp"
+        cmd = [
+            'ffmpeg', '-y', '-f', 's16le', '-ar', '44100', '-ac', '1',
+            '-i', 'pipe:0', '-c:a', 'libmp3lame', '-b:a', '64k', '-f', 'mp3', tmp_path
+        ]
+        result = self._submit_ffmpeg(cmd, pcm)
+
+        if result.returncode == 0:
+            os.replace(tmp_path, base_path)
+            return base_path
+        return None
+
+    def _generate_silence_audio(self, duration: float, output_path: str) -> Dict[str, Any]:
+        """生成指定时长的静音音频"""
+        try:
+            # 先写临时文件再原子重命名，半成品不会被后续步骤读到
+            tmp_path = output_path + ".tmp"
+
+            # 优先用缓存的1秒静音经concat流复制拼出目标时长，免去编码开销
+            base_path = self._ensure_silence_base()
+            if base_path is not None and duration > 0:
+                repeats = max(1, -(-int(duration * 1000) // 1000))  # 向上取整到秒
+                list_path = output_path + ".list"
+                with open(list_path, 'w') as f:
+                    f.write(f"file '{os.path.abspath(base_path)}'\n" * repeats)
+
+                cmd = [
+                    'ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', list_path,
+                    '-t', f'{duration:.3f}', '-c', 'copy', '-f', 'mp3', tmp_path
+                ]
+                result = self._submit_ffmpeg(cmd)
+                try:
+                    os.remove(list_path)
+                except OSError:
+                    pass
+
+                if result.returncode == 0:
+                    os.replace(tmp_path, output_path)
+                    return {"success": True, "file_path": output_path}
+
+            # 回退：直接构造16bit单声道零样本PCM并用ffmpeg编码为MP3
+            # （soundfile写.mp3依赖libsndfile的MP3支持，不可靠）
+            sample_rate = 44100
+            samples = int(duration * sample_rate)
+            pcm = b"\x00\x00" * samples
+
+            cmd = [
+                'ffmpeg', '-y', '-f', 's16le', '-ar', str(sample_rate), '-ac', '1',
+                '-i', 'pipe:0', '-c:a', 'libmp3lame', '-b:a', '64k', '-f', 'mp3', tmp_path
+            ]
+            result = self._submit_ffmpeg(cmd, pcm)
+
+            if result.returncode == 0:
+                os.replace(tmp_path, output_path)
+                return {"success": True, "file_path": output_path}
+
+            # 回退到lavfi静音源
+            cmd = [
+                'ffmpeg', '-f', 'lavfi', '-i', f'anullsrc=duration={duration}',
+                '-c:a', 'mp3', '-y', '-f', 'mp3', tmp_path
+            ]
+            result = self._submit_ffmpeg(cmd)
+
+            if result.returncode == 0:
+                os.replace(tmp_path, output_path)
+                return {"success": True, "file_path": output_path}
+            else:
+                return {"success": False, "error": "ffmpeg生成静音失败"}
+
+        except Exception as e:
+            return {"success": False, "error": f"静音生成异常: {str(e)}"}
+
+    async def batch_optimize_async(self, segments: list) -> list:
+        """批量优化的流水线版本：滚动窗口并发执行各片段的异步优化链
+
+        信号量限制同时在途的片段数，某片段做本地时长检查/ffmpeg处理时，
+        下一片段的TTS请求已经发出，网络延迟被CPU侧处理掩盖。
+        API的QPS限制仍由TTS/LLM服务内部的rate_limiter统一把关。
+        """
+        total = len(segments)
+        window = max(1, getattr(self.config, 'tts_concurrency', 4) or 4)
+        semaphore = asyncio.Semaphore(window)
+
+        async def _optimize_one(index: int, segment: Dict[str, Any]):
+            async with semaphore:
+                self.logger.log("INFO", f"正在优化第{index+1}/{total}个片段...")
+
+                # 解析时间戳获取目标时长
+                timestamp = segment.get('timestamp', '0-3')
+                start_time, end_time = self._parse_timestamp(timestamp)
+                target_duration = end_time - start_time
+
+                result = await self.optimize_segment_async(segment, target_duration)
+
+                # 对外仍然返回字典，保持原有调用方的数据结构
+                result_dict = asdict(result)
+                result_dict['segment_id'] = segment.get('sequence', index)
+                return index, result_dict
+
+        # 按提交顺序回填结果，保证返回顺序与输入一致
+        results = [None] * total
+        tasks = [_optimize_one(i, seg) for i, seg in enumerate(segments)]
+        for coro in asyncio.as_completed(tasks):
+            index, result_dict = await coro
+            results[index] = result_dict
+
+        return results
+
+    def batch_optimize(self, segments: list) -> list:
+        """批量优化多个片段（同步入口，内部跑异步流水线）"""
+        return asyncio.run(self.batch_optimize_async(segments))
+
+    def _parse_timestamp(self, timestamp: str) -> Tuple[float, float]:
+        """解析时间戳"""
+        m = _TS_RE.match(timestamp)
+        if m:
+            return float(m.group(1)), float(m.group(2))
+        return 0.0, 3.0  # 默认值
@@ -1,297 +1,440 @@
-import os
-import whisper
-import librosa
-import numpy as np
-from typing import List, Dict, Any, Tuple
-
-class ASRProcessor:
-    def __init__(self, config, logger_service):
-        self.config = config
-        self.logger = logger_service
-        self.model = None
-        
-    def load_model(self):
-        """加载Whisper模型"""
-        if self.model is None:
-            try:
-                self.logger.log("INFO", "加载Whisper模型...")
-                self.model = whisper.load_model("base")
-                self.logger.log("INFO", "Whisper模型加载完成")
-            except Exception as e:
-                self.logger.log("ERROR", f"Whisper模型加载失败: {str(e)}")
-                raise e
-    
-    def transcribe_audio(self, audio_path: str) -> Dict[str, Any]:
-        """语音识别"""
-        try:
-            self.load_model()
-            
-            self.logger.log("INFO", f"开始ASR语音识别: {audio_path}")
-            
-            # 将配置的原语言转换为Whisper语言代码
-            language_code = self._get_whisper_language_code(self.config.source_language)
-            self.logger.log("INFO", f"使用语言代码进行ASR识别: {self.config.source_language} -> {language_code}")
-            
-            # 使用Whisper进行识别
-            result = self.model.transcribe(
-                audio_path,
-                language=language_code,
-                word_timestamps=True,  # 启用词级时间戳
-                verbose=False
-            )
-            
-            # 提取分段信息
-            segments = []
-            for segment in result['segments']:
-                segments.append({
-                    'start': segment['start'],
-                    'end': segment['end'],
-                    'text': segment['text'].strip(),
-                    'words': segment.get('words', [])
-                })
-            
-            self.logger.log("INFO", f"ASR识别完成，检测到{len(segments)}个原始片段")
-            
-            return {
-                "success": True,
-                "text": result['text'],
-                "segments": segments,
-                "language": result.get('language', 'zh')
-            }
-            
-        except Exception as e:
-            error_msg = f"ASR识别失败: {str(e)}"
-            self.logger.log("ERROR", error_msg)
-            return {"success": False, "error": error_msg}
-    
-    def smart_segment_split(self, segments: List[Dict], audio_path: str) -> List[Dict]:
-        """智能切分语音片段"""
-        try:
-            self.logger.log("INFO", "开始智能切分语音片段...")
-            
-            # 获取配置参数
-            min_duration = self.config.min_segment_duration
-            max_duration = self.config.max_segment_duration
-            split_mode = self.config.asr_split_mode
-            
-            # 根据模式调整参数
-            if split_mode == "保守模式":
-                target_duration = 5.0
-                merge_threshold = 2.0
-            elif split_mode == "激进模式":
-                target_duration = 2.5
-                merge_threshold = 1.0
-            else:  # 平衡模式
-                target_duration = 3.5
-                merge_threshold = 1.5
-            
-            optimized_segments = []
-            current_segment = None
-            sequence = 1
-            
-            for segment in segments:
-                duration = segment['end'] - segment['start']
-                text = segment['text']
-                
-                # 如果当前片段太短，尝试与下一个合并
-                if duration < min_duration and current_segment is None:
-                    current_segment = segment.copy()
-                    continue
-                
-                # 如果有待合并的片段
-                if current_segment is not None:
-                    # 检查合并后的时长
-                    merged_duration = segment['end'] - current_segment['start']
-                    
-                    if merged_duration <= max_duration:
-                        # 合并片段
-                        current_segment['end'] = segment['end']
-                        current_segment['text'] += segment['text']
-                        
-                        # 如果合并后达到目标时长，输出片段
-                        if merged_duration >= target_duration:
-                            optimized_segments.append(self._create_segment(
-                                current_segment, sequence, audio_path
-                            ))
-                            sequence += 1
-                            current_segment = None
-                    else:
-                        # 输出当前片段，开始新片段
-                        optimized_segments.append(self._create_segment(
-                            current_segment, sequence, audio_path
-                        ))
-                        sequence += 1
-                        current_segment = segment.copy()
-                else:
-                    # 检查片段是否需要拆分
-                    if duration > max_duration:
-                        # 拆分长片段
-                        split_segments = self._split_long_segment(segment, max_duration)
-                        for split_seg in split_segments:
-                            optimized_segments.append(self._create_segment(
-                                split_seg, sequence, audio_path
-                            ))
-                            sequence += 1
-                    elif duration >= min_duration:
-                        # 直接使用合适的片段
-                        optimized_segments.append(self._create_segment(
-                            segment, sequence, audio_path
-                        ))
-                        sequence += 1
-                    else:
-                        # 太短的片段暂存
-                        current_segment = segment.copy()
-            
-            # 处理最后的待合并片段
-            if current_segment is not None:
-                optimized_segments.append(self._create_segment(
-                    current_segment, sequence, audio_path
-                ))
-            
-            self.logger.log("INFO", f"智能切分完成，优化后得到{len(optimized_segments)}个片段")
-            
-            return optimized_segments
-            
-        except Exception as e:
-            error_msg = f"智能切分失败: {str(e)}"
-            self.logger.log("ERROR", error_msg)
-            return []
-    
-    def _create_segment(self, segment: Dict, sequence: int, audio_path: str) -> Dict:
-        """创建标准片段数据结构"""
-        start_time = segment['start']
-        end_time = segment['end']
-        text = segment['text'].strip()
-        
-        # 提取音频片段（纯人声，便于编辑和克隆）
-        segment_audio_path = self._extract_audio_segment(
-            audio_path, start_time, end_time, sequence
-        )
-        
-        return {
-            "sequence": sequence,
-            "timestamp": f"{start_time:.2f}-{end_time:.2f}",
-            "original_text": text,
-            "translated_text": "",
-            "original_audio_path": segment_audio_path,  # 纯人声片段
-            "translated_audio_path": "",
-            "voice_id": "",
-            "speed": 1.0
-        }
-    
-    def _split_long_segment(self, segment: Dict, max_duration: float) -> List[Dict]:
-        """拆分过长的片段"""
-        duration = segment['end'] - segment['start']
-        text = segment['text']
-        
-        # 简单的时间均分策略
-        num_splits = int(np.ceil(duration / max_duration))
-        split_duration = duration / num_splits
-        
-        splits = []
-        for i in range(num_splits):
-            start = segment['start'] + i * split_duration
-            end = min(segment['start'] + (i + 1) * split_duration, segment['end'])
-            
-            # 简单的文本分割（按字符数量）
-            text_start = int(i * len(text) / num_splits)
-            text_end = int((i + 1) * len(text) / num_splits)
-            split_text = text[text_start:text_end].strip()
-            
-            splits.append({
-                'start': start,
-                'end': end,
-                'text': split_text,
-                'words': []
-            })
-        
-        return splits
-    
-    def _extract_audio_segment(self, audio_path: str, start_time: float, 
-                              end_time: float, sequence: int) -> str:
-        """提取音频片段"""
-        try:
-            output_path = f"./temp/segment_{sequence}_original.wav"
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            
-            # 使用librosa提取音频片段
-            y, sr = librosa.load(audio_path, sr=16000)
-            
-            start_sample = int(start_time * sr)
-            end_sample = int(end_time * sr)
-            
-            segment_audio = y[start_sample:end_sample]
-            
-            # 保存音频片段
-            import soundfile as sf
-            sf.write(output_path, segment_audio, sr)
-            
-            return output_path
-            
-        except Exception as e:
-            self.logger.log("ERROR", f"提取音频片段失败: {str(e)}")
-            return ""
-    
-    def process_audio(self, audio_path: str) -> List[Dict]:
-        """完整的音频处理流程"""
-        try:
-            # 1. ASR识别
-            asr_result = self.transcribe_audio(audio_path)
-            if not asr_result["success"]:
-                return []
-            
-            # 2. 智能切分
-            segments = self.smart_segment_split(asr_result["segments"], audio_path)
-            
-            return segments
-            
-        except Exception as e:
-            self.logger.log("ERROR", f"音频处理失败: {str(e)}")
-            return []
-    
-    def _get_whisper_language_code(self, language_name: str) -> str:
-        """将配置的语言名称转换为Whisper语言代码"""
-        language_mapping = {
-            "中文": "zh",
-            "粤语": "yue", 
-            "英语": "en",
-            "西班牙语": "es",
-            "法语": "fr",
-            "俄语": "ru",
-            "德语": "de",
-            "葡萄牙语": "pt",
-            "阿拉伯语": "ar",
-            "意大利语": "it",
-            "日语": "ja",
-            "韩语": "ko",
-            "印尼语": "id",
-            "越南语": "vi",
-            "土耳其语": "tr",
-            "荷兰语": "nl",
-            "乌克兰语": "uk",
-            "泰语": "th",
-            "波兰语": "pl",
-            "罗马尼亚语": "ro",
-            "希腊语": "el",
-            "捷克语": "cs",
-            "芬兰语": "fi",
-            "印地语": "hi",
-            "保加利亚语": "bg",
-            "丹麦语": "da",
-            "希伯来语": "he",
-            "马来语": "ms",
-            "波斯语": "fa",
-            "斯洛伐克语": "sk",
-            "瑞典语": "sv",
-            "克罗地亚语": "hr",
-            "菲律宾语": "tl",
-            "匈牙利语": "hu",
-            "挪威语": "no",
-            "斯洛文尼亚语": "sl",
-            "加泰罗尼亚语": "ca",
-            "尼诺斯克语": "nn",
-            "泰米尔语": "ta",
-            "阿非利卡语": "af"
-        }
-        
-        return language_mapping.get(language_name, "zh")  # 默认返回中文
\ No newline at end of file
+import os
+import whisper
+import librosa
+import numpy as np
+from pathlib import Path
+from typing import List, Dict, Any, Tuple
+
+def _split_times(start: float, end: float, max_duration: float):
+    """把长片段按max_duration均分，返回各子段的起止时间数组"""
+    n = int(np.ceil((end - start) / max_duration))
+    dt = (end - start) / n
+    offsets = np.arange(n)
+    seg_starts = start + offsets * dt
+    seg_ends = np.minimum(start + (offsets + 1) * dt, end)
+    return seg_starts, seg_ends
+
+try:
+    # numba可用时JIT编译数值部分，长片段很多时省掉Python循环开销
+    from numba import njit
+    _split_times = njit(cache=True)(_split_times)
+except ImportError:
+    pass
+
+# 语言名称到Whisper语言代码的映射，模块加载时构建一次
+_WHISPER_LANG_MAP = {
+    "中文": "zh",
+    "粤语": "yue", 
+    "英语": "en",
+    "西班牙语": "es",
+    "法语": "fr",
+    "俄语": "ru",
+    "德语": "de",
+    "葡萄牙语": "pt",
+    "阿拉伯语": "ar",
+    "意大利语": "it",
+    "日语": "ja",
+    "韩语": "ko",
+    "印尼语": "id",
+    "越南语": "vi",
+    "土耳其语": "tr",
+    "荷兰语": "nl",
+    "乌克兰语": "uk",
+    "泰语": "th",
+    "波兰语": "pl",
+    "罗马尼亚语": "ro",
+    "希腊语": "el",
+    "捷克语": "cs",
+    "芬兰语": "fi",
+    "印地语": "hi",
+    "保加利亚语": "bg",
+    "丹麦语": "da",
+    "希伯来语": "he",
+    "马来语": "ms",
+    "波斯语": "fa",
+    "斯洛伐克语": "sk",
+    "瑞典语": "sv",
+    "克罗地亚语": "hr",
+    "菲律宾语": "tl",
+    "匈牙利语": "hu",
+    "挪威语": "no",
+    "斯洛文尼亚语": "sl",
+    "加泰罗尼亚语": "ca",
+    "尼诺斯克语": "nn",
+    "泰米尔语": "ta",
+    "阿非利卡语": "af"
+        }
+
+class ASRProcessor:
+    def __init__(self, config, logger_service):
+        self.config = config
+        self.logger = logger_service
+        self.model = None
+        self._use_faster_whisper = False
+        # 临时目录只创建一次，片段提取热路径上不再有makedirs系统调用
+        self._temp_dir = Path('./temp')
+        self._temp_dir.mkdir(exist_ok=True)
+        # 整段音频解码缓存，键为 (路径, 采样率)；切分N个片段只解码一次
+        self._audio_cache: Dict[Tuple[str, int], Tuple[np.ndarray, int]] = {}
+
+    def _load_audio(self, audio_path: str, sr: int = 16000) -> Tuple[np.ndarray, int]:
+        """加载音频并缓存，避免每个片段都重新解码整个文件"""
+        key = (audio_path, sr)
+        cached = self._audio_cache.get(key)
+        if cached is None:
+            y, loaded_sr = librosa.load(audio_path, sr=sr)
+            # 只保留当前源文件，长音频不会越积越多
+            self._audio_cache.clear()
+            cached = (y, loaded_sr)
+            self._audio_cache[key] = cached
+        return cached
+
+    @staticmethod
+    def _detect_compute_device() -> Tuple[str, str]:
+        """选择faster-whisper的设备和量化精度"""
+        try:
+            import torch
+            if torch.cuda.is_available():
+                return "cuda", "int8_float16"
+        except ImportError:
+            pass
+        return "cpu", "int8"
+
+    def _vad_parameters(self) -> Dict[str, Any]:
+        """把切分配置映射为Silero VAD参数，片段划分交由C++侧完成"""
+        split_mode = self.config.asr_split_mode
+        if split_mode == "保守模式":
+            speech_pad_ms = 400
+        elif split_mode == "激进模式":
+            speech_pad_ms = 100
+        else:  # 平衡模式
+            speech_pad_ms = 200
+
+        return {
+            "min_silence_duration_ms": int(self.config.silence_threshold * 1000),
+            "max_speech_duration_s": self.config.max_segment_duration,
+            "speech_pad_ms": speech_pad_ms,
+        }
+
+    def load_model(self):
+        """加载Whisper模型（优先faster-whisper的CTranslate2实现，约4倍吞吐）"""
+        if self.model is None:
+            try:
+                self.logger.log("INFO", "加载Whisper模型...")
+                try:
+                    from faster_whisper import WhisperModel
+                    device, compute_type = self._detect_compute_device()
+                    self.model = WhisperModel("base", device=device, compute_type=compute_type)
+                    self._use_faster_whisper = True
+                    self.logger.log("INFO", f"faster-whisper模型加载完成 ({device}/{compute_type})")
+                except ImportError:
+                    self.model = whisper.load_model("base")
+                    self._use_faster_whisper = False
+                    self.logger.log("INFO", "Whisper模型加载完成")
+            except Exception as e:
+                self.logger.log("ERROR", f"Whisper模型加载失败: {str(e)}")
+                raise e
+
+    def warmup(self):
+        """预热模型：启动时调用，把加载和首次推理的开销移出用户路径
+
+        首次transcribe会触发内核选择/JIT等一次性成本，用1秒静音提前跑一遍。
+        """
+        self.load_model()
+        try:
+            dummy = np.zeros(16000, dtype=np.float32)
+            if self._use_faster_whisper:
+                segments, _ = self.model.transcribe(dummy, language="en")
+                list(segments)  # 迭代器是惰性的，消费掉才会真正执行解码
+            else:
+                self.model.transcribe(dummy, language="en")
+            self.logger.log("INFO", "Whisper模型预热完成")
+        except Exception as e:
+            # 预热失败不影响正常流程，首次识别时照常加载
+            self.logger.log("WARNING", f"Whisper模型预热失败: {str(e)}")
+
+    def transcribe_audio(self, audio_path: str) -> Dict[str, Any]:
+        """语音识别"""
+        try:
+            self.load_model()
+            
+            self.logger.log("INFO", f"开始ASR语音识别: {audio_path}")
+            
+            # 将配置的原语言转换为Whisper语言代码
+            language_code = self._get_whisper_language_code(self.config.source_language)
+            self.logger.log("INFO", f"使用语言代码进行ASR识别: {self.config.source_language} -> {language_code}")
+            
+            if self._use_faster_whisper:
+                # faster-whisper返回惰性片段迭代器，边解码边收集
+                segments_iter, info = self.model.transcribe(
+                    audio_path,
+                    language=language_code,
+                    word_timestamps=True,  # 启用词级时间戳
+                    vad_filter=True,
+                    vad_parameters=self._vad_parameters()
+                )
+
+                segments = []
+                text_parts = []
+                for segment in segments_iter:
+                    segments.append({
+                        'start': segment.start,
+                        'end': segment.end,
+                        'text': segment.text.strip(),
+                        'words': [
+                            {'start': w.start, 'end': w.end, 'word': w.word}
+                            for w in (segment.words or [])
+                        ]
+                    })
+                    text_parts.append(segment.text)
+
+                full_text = "".join(text_parts)
+                language = info.language
+            else:
+                # 使用Whisper进行识别
+                result = self.model.transcribe(
+                    audio_path,
+                    language=language_code,
+                    word_timestamps=True,  # 启用词级时间戳
+                    verbose=False
+                )
+
+                segments = []
+                for segment in result['segments']:
+                    segments.append({
+                        'start': segment['start'],
+                        'end': segment['end'],
+                        'text': segment['text'].strip(),
+                        'words': segment.get('words', [])
+                    })
+
+                full_text = result['text']
+                language = result.get('language', 'zh')
+
+            self.logger.log("INFO", f"ASR识别完成，检测到{len(segments)}个原始片段")
+
+            return {
+                "success": True,
+                "text": full_text,
+                "segments": segments,
+                "language": language
+            }
+            
+        except Exception as e:
+            error_msg = f"ASR识别失败: {str(e)}"
+            self.logger.log("ERROR", error_msg)
+            return {"success": False, "error": error_msg}
+    
+    def smart_segment_split(self, segments: List[Dict], audio_path: str) -> List[Dict]:
+        """智能切分语音片段"""
+        try:
+            self.logger.log("INFO", "开始智能切分语音片段...")
+
+            # faster-whisper已按VAD参数完成切分，这里只需编号并提取片段
+            if self._use_faster_whisper:
+                optimized_segments = [
+                    self._create_segment(segment, i + 1, audio_path)
+                    for i, segment in enumerate(segments)
+                ]
+                self.logger.log("INFO", f"VAD切分完成，得到{len(optimized_segments)}个片段")
+                return optimized_segments
+
+            # 获取配置参数
+            min_duration = self.config.min_segment_duration
+            max_duration = self.config.max_segment_duration
+            split_mode = self.config.asr_split_mode
+            
+            # 根据模式调整参数
+            if split_mode == "保守模式":
+                target_duration = 5.0
+                merge_threshold = 2.0
+            elif split_mode == "激进模式":
+                target_duration = 2.5
+                merge_threshold = 1.0
+            else:  # 平衡模式
+                target_duration = 3.5
+                merge_threshold = 1.5
+            
+            # SoA预计算：起止时间一次性抽成数组，循环内不再重复做dict哈希查找
+            count = len(segments)
+            starts = np.fromiter((s['start'] for s in segments), dtype=np.float64, count=count)
+            ends = np.fromiter((s['end'] for s in segments), dtype=np.float64, count=count)
+            durations = ends - starts
+
+            optimized_segments = []
+            current_segment = None
+            sequence = 1
+
+            for i, segment in enumerate(segments):
+                duration = durations[i]
+                text = segment['text']
+                
+                # 如果当前片段太短，尝试与下一个合并
+                if duration < min_duration and current_segment is None:
+                    current_segment = segment.copy()
+                    continue
+                
+                # 如果有待合并的片段
+                if current_segment is not None:
+                    # 检查合并后的时长
+                    merged_duration = ends[i] - current_segment['start']
+                    
+                    if merged_duration <= max_duration:
+                        # 合并片段
+                        current_segment['end'] = ends[i]
+                        current_segment['text'] += segment['text']
+                        
+                        # 如果合并后达到目标时长，输出片段
+                        if merged_duration >= target_duration:
+                            optimized_segments.append(self._create_segment(
+                                current_segment, sequence, audio_path
+                            ))
+                            sequence += 1
+                            current_segment = None
+                    else:
+                        # 输出当前片段，开始新片段
+                        optimized_segments.append(self._create_segment(
+                            current_segment, sequence, audio_path
+                        ))
+                        sequence += 1
+                        current_segment = segment.copy()
+                else:
+                    # 检查片段是否需要拆分
+                    if duration > max_duration:
+                        # 拆分长片段
+                        split_segments = self._split_long_segment(segment, max_duration)
+                        for split_seg in split_segments:
+                            optimized_segments.append(self._create_segment(
+                                split_seg, sequence, audio_path
+                            ))
+                            sequence += 1
+                    elif duration >= min_duration:
+                        # 直接使用合适的片段
+                        optimized_segments.append(self._create_segment(
+                            segment, sequence, audio_path
+                        ))
+                        sequence += 1
+                    else:
+                        # 太短的片段暂存
+                        current_segment = segment.copy()
+            
+            # 处理最后的待合并片段
+            if current_segment is not None:
+                optimized_segments.append(self._create_segment(
+                    current_segment, sequence, audio_path
+                ))
+            
+            self.logger.log("INFO", f"智能切分完成，优化后得到{len(optimized_segments)}个片段")
+            
+            return optimized_segments
+            
+        except Exception as e:
+            error_msg = f"智能切分失败: {str(e)}"
+            self.logger.log("ERROR", error_msg)
+            return []
+    
+    def _create_segment(self, segment: Dict, sequence: int, audio_path: str) -> Dict:
+        """创建标准片段数据结构"""
+        start_time = segment['start']
+        end_time = segment['end']
+        text = segment['text'].strip()
+        
+        # 提取音频片段（纯人声，便于编辑和克隆）
+        segment_audio_path = self._extract_audio_segment(
+            audio_path, start_time, end_time, sequence
+        )
+        
+        return {
+            "sequence": sequence,
+            "timestamp": f"{start_time:.2f}-{end_time:.2f}",
+            "original_text": text,
+            "translated_text": "",
+            "original_audio_path": segment_audio_path,  # 纯人声片段
+            "translated_audio_path": "",
+            "voice_id": "",
+            "speed": 1.0
+        }
+    
+    def _split_long_segment(self, segment: Dict, max_duration: float) -> List[Dict]:
+        """拆分过长的片段"""
+        text = segment['text']
+
+        # 时间均分的数值部分向量化计算（numba可用时为JIT编译版本）
+        seg_starts, seg_ends = _split_times(
+            float(segment['start']), float(segment['end']), float(max_duration)
+        )
+        num_splits = len(seg_starts)
+
+        splits = []
+        for i in range(num_splits):
+            # 简单的文本分割（按字符数量）
+            text_start = int(i * len(text) / num_splits)
+            text_end = int((i + 1) * len(text) / num_splits)
+            split_text = text[text_start:text_end].strip()
+
+            splits.append({
+                'start': float(seg_starts[i]),
+                'end': float(seg_ends[i]),
+                'text': split_text,
+                'words': []
+            })
+
+        return splits
+    
+    def _extract_audio_segment(self, audio_path: str, start_time: float,
+                              end_time: float, sequence: int) -> str:
+        """提取音频片段"""
+        try:
+            output_path = str(self._temp_dir / f"segment_{sequence}_original.wav")
+
+            # 优先让ffmpeg直接按时间区间转出片段，省掉Python侧整段解码/再编码
+            import subprocess
+            result = subprocess.run([
+                'ffmpeg', '-ss', f'{start_time:.3f}', '-to', f'{end_time:.3f}',
+                '-i', audio_path, '-ac', '1', '-ar', '16000',
+                '-acodec', 'pcm_s16le', '-y', output_path
+            ], capture_output=True)
+
+            if result.returncode == 0:
+                return output_path
+
+            self.logger.log("WARNING", "ffmpeg片段提取失败，回退到librosa切片")
+
+            # 回退：使用缓存的整段解码结果切片
+            y, sr = self._load_audio(audio_path, sr=16000)
+
+            start_sample = int(start_time * sr)
+            end_sample = int(end_time * sr)
+
+            segment_audio = y[start_sample:end_sample]
+
+            # 保存音频片段
+            import soundfile as sf
+            sf.write(output_path, segment_audio, sr)
+
+            return output_path
+
+        except Exception as e:
+            self.logger.log("ERROR", f"提取音频片段失败: {str(e)}")
+            return ""
+    
+    def process_audio(self, audio_path: str) -> List[Dict]:
+        """完整的音频处理流程"""
+        try:
+            # 1. ASR识别
+            asr_result = self.transcribe_audio(audio_path)
+            if not asr_result["success"]:
+                return []
+            
+            # 2. 智能切分
+            segments = self.smart_segment_split(asr_result["segments"], audio_path)
+            
+            return segments
+            
+        except Exception as e:
+            self.logger.log("ERROR", f"音频处理失败: {str(e)}")
+            return []
+    
+    def _get_whisper_language_code(self, language_name: str) -> str:
+        """将配置的语言名称转换为Whisper语言代码"""
+        return _WHISPER_LANG_MAP.get(language_name, "zh")  # 默认返回中文
@@ -1,284 +1,621 @@
-import os
-import subprocess
-import time
-from typing import Dict, Any, Optional
-from pathlib import Path
-
-class AudioPreprocessor:
-    """音频预处理服务，专门负责人声提取、背景音分离等处理"""
-    
-    def __init__(self, logger_service):
-        self.logger = logger_service
-    
-    def extract_voice(self, input_path: str, voice_output_path: str = None,
-                     background_output_path: str = None) -> Dict[str, Any]:
-        """
-        从音频中分离人声和背景音
-        
-        Args:
-            input_path: 输入音频文件路径
-            voice_output_path: 人声输出路径，如果为None则自动生成
-            background_output_path: 背景音输出路径，如果为None则自动生成
-            
-        Returns:
-            处理结果字典，包含人声和背景音路径
-        """
-        try:
-            input_name = Path(input_path).stem
-            
-            if not voice_output_path:
-                voice_output_path = f"./temp/{input_name}_voice.wav"
-            if not background_output_path:
-                background_output_path = f"./temp/{input_name}_background.wav"
-            
-            # 确保输出目录存在
-            os.makedirs(os.path.dirname(voice_output_path), exist_ok=True)
-            os.makedirs(os.path.dirname(background_output_path), exist_ok=True)
-            
-            self.logger.log("INFO", "开始人声和背景音分离...")
-            
-            # 方法1：使用中央声道提取（适用于大部分音乐和视频）
-            voice_result = self._extract_center_channel(input_path, voice_output_path)
-            
-            # 方法2：提取背景音（原音频减去人声部分）  
-            background_result = self._extract_background(input_path, voice_output_path, background_output_path)
-            
-            if voice_result["success"] and background_result["success"]:
-                # 获取音频信息
-                voice_duration = self._get_audio_duration(voice_output_path)
-                voice_size = os.path.getsize(voice_output_path)
-                background_duration = self._get_audio_duration(background_output_path)
-                background_size = os.path.getsize(background_output_path)
-                
-                self.logger.log("INFO", f"人声提取完成: 时长{voice_duration:.2f}s, 大小{voice_size/1024/1024:.2f}MB")
-                self.logger.log("INFO", f"背景音提取完成: 时长{background_duration:.2f}s, 大小{background_size/1024/1024:.2f}MB")
-                
-                return {
-                    "success": True,
-                    "voice_path": voice_output_path,
-                    "background_path": background_output_path,
-                    "voice_duration": voice_duration,
-                    "background_duration": background_duration,
-                    "voice_size": voice_size,
-                    "background_size": background_size
-                }
-            else:
-                error_msgs = []
-                if not voice_result["success"]:
-                    error_msgs.append(f"人声提取失败: {voice_result['error']}")
-                if not background_result["success"]:
-                    error_msgs.append(f"背景音提取失败: {background_result['error']}")
-                
-                return {"success": False, "error": "; ".join(error_msgs)}
-            
-        except Exception as e:
-            error_msg = f"音频预处理异常: {str(e)}"
-            self.logger.log("ERROR", error_msg)
-            return {"success": False, "error": error_msg}
-    
-    def _extract_center_channel(self, input_path: str, output_path: str) -> Dict[str, Any]:
-        """提取中央声道（人声）- 增强版"""
-        try:
-            # 使用更强的人声分离算法
-            cmd = [
-                'ffmpeg', '-i', input_path,
-                '-af', '''
-                    [0:a]channelsplit=channel_layout=stereo[left][right];
-                    [left][right]amerge=inputs=2[stereo];
-                    [stereo]extrastereo=m=2.5,
-                    highpass=f=100,
-                    lowpass=f=7000,
-                    compand=0.02,0.05:-60/-60,-30/-15,-20/-10,-5/-5,0/-3:6:0:-3,
-                    dynaudnorm=f=500:g=3:r=0.3:s=9,
-                    volume=1.5
-                '''.replace('\n', '').replace(' ', ''),
-                # extrastereo: 增强立体声分离，突出中央人声
-                # highpass/lowpass: 人声频率范围100-7000Hz
-                # compand: 动态压缩，减少背景音噪声
-                # dynaudnorm: 动态标准化
-                # volume: 适当增强音量
-                '-ar', '16000',  # 采样率16kHz
-                '-ac', '1',      # 单声道
-                '-y', output_path
-            ]
-            
-            self.logger.log("INFO", "开始增强人声提取...")
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-            
-            if result.returncode == 0:
-                return {"success": True, "output_path": output_path}
-            else:
-                # 如果增强算法失败，回退到简单方法
-                self.logger.log("WARNING", f"增强人声提取失败，尝试简单方法: {result.stderr}")
-                return self._extract_center_channel_simple(input_path, output_path)
-                
-        except subprocess.TimeoutExpired:
-            return {"success": False, "error": "人声提取超时"}
-        except Exception as e:
-            self.logger.log("WARNING", f"增强人声提取异常，尝试简单方法: {str(e)}")
-            return self._extract_center_channel_simple(input_path, output_path)
-    
-    def _extract_center_channel_simple(self, input_path: str, output_path: str) -> Dict[str, Any]:
-        """简单人声提取（备用方法）"""
-        try:
-            cmd = [
-                'ffmpeg', '-i', input_path,
-                '-af', 'pan=mono|c0=0.5*c0+0.5*c1,highpass=f=80,lowpass=f=8000,dynaudnorm=f=500:g=3:r=0.3',
-                '-ar', '16000',
-                '-ac', '1',
-                '-y', output_path
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-            
-            if result.returncode == 0:
-                return {"success": True, "output_path": output_path}
-            else:
-                return {"success": False, "error": f"简单人声提取失败: {result.stderr}"}
-                
-        except Exception as e:
-            return {"success": False, "error": f"简单人声提取异常: {str(e)}"}
-    
-    def _extract_background(self, original_path: str, voice_path: str, output_path: str) -> Dict[str, Any]:
-        """提取背景音（原音频减去人声）- 增强版"""
-        try:
-            # 使用多种技术提取背景音
-            cmd = [
-                'ffmpeg', '-i', original_path,
-                '-af', '''
-                    [0:a]channelsplit=channel_layout=stereo[left][right];
-                    [left][right]amerge=inputs=2,
-                    pan=mono|c0=0.5*c0+-0.5*c1,
-                    highpass=f=20,
-                    lowpass=f=15000,
-                    compand=0.02,0.05:-60/-60,-40/-25,-20/-15,-10/-8,0/-5:6:0:-5,
-                    volume=0.8
-                '''.replace('\n', '').replace(' ', ''),
-                # 相位抵消技术去除中央人声
-                # 保留更宽的频率范围以保持背景音质量
-                # 适度压缩和音量调整
-                '-ar', '44100',  # 保持较高采样率用于背景音
-                '-ac', '2',      # 立体声
-                '-y', output_path
-            ]
-            
-            self.logger.log("INFO", "开始提取背景音...")
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-            
-            if result.returncode == 0:
-                return {"success": True, "output_path": output_path}
-            else:
-                # 回退到简单方法
-                self.logger.log("WARNING", f"增强背景音提取失败，尝试简单方法: {result.stderr}")
-                return self._extract_background_simple(original_path, output_path)
-                
-        except subprocess.TimeoutExpired:
-            return {"success": False, "error": "背景音提取超时"}
-        except Exception as e:
-            self.logger.log("WARNING", f"增强背景音提取异常，尝试简单方法: {str(e)}")
-            return self._extract_background_simple(original_path, output_path)
-    
-    def _extract_background_simple(self, original_path: str, output_path: str) -> Dict[str, Any]:
-        """简单背景音提取（备用方法）"""
-        try:
-            cmd = [
-                'ffmpeg', '-i', original_path,
-                '-af', 'pan=mono|c0=0.5*c0+-0.5*c1',
-                '-y', output_path
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-            
-            if result.returncode == 0:
-                return {"success": True, "output_path": output_path}
-            else:
-                return {"success": False, "error": f"简单背景音提取失败: {result.stderr}"}
-                
-        except Exception as e:
-            return {"success": False, "error": f"简单背景音提取异常: {str(e)}"}
-    
-    def _get_audio_duration(self, audio_path: str) -> float:
-        """获取音频时长"""
-        try:
-            cmd = [
-                'ffprobe', '-v', 'quiet', '-print_format', 'json',
-                '-show_format', audio_path
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                import json
-                data = json.loads(result.stdout)
-                return float(data['format']['duration'])
-            else:
-                return 0.0
-                
-        except Exception:
-            return 0.0
-    
-    def _cleanup_temp_files(self, file_paths: list, keep: str = None):
-        """清理临时文件"""
-        for file_path in file_paths:
-            if file_path and file_path != keep and os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                    self.logger.log("DEBUG", f"清理临时文件: {file_path}")
-                except Exception as e:
-                    self.logger.log("WARNING", f"清理临时文件失败: {file_path} - {str(e)}")
-    
-    def analyze_audio_content(self, audio_path: str) -> Dict[str, Any]:
-        """分析音频内容，判断是否需要人声背景音分离"""
-        try:
-            # 使用ffprobe分析音频特征
-            cmd = [
-                'ffprobe', '-v', 'quiet', '-print_format', 'json',
-                '-show_format', '-show_streams', audio_path
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                import json
-                data = json.loads(result.stdout)
-                
-                # 获取音频流信息
-                audio_stream = None
-                for stream in data.get('streams', []):
-                    if stream.get('codec_type') == 'audio':
-                        audio_stream = stream
-                        break
-                
-                if audio_stream:
-                    sample_rate = int(audio_stream.get('sample_rate', 0))
-                    channels = int(audio_stream.get('channels', 0))
-                    duration = float(data['format'].get('duration', 0))
-                    
-                    # 更积极的音频内容评估逻辑
-                    needs_voice_extraction = True  # 默认启用人声分离
-                    reasons = []
-                    
-                    if channels > 1:
-                        reasons.append("立体声音频，进行人声背景音分离")
-                    else:
-                        reasons.append("单声道音频，进行人声增强处理")
-                    
-                    if duration > 5:
-                        reasons.append("音频时长超过5秒，进行人声分离优化")
-                    
-                    # 只有非常短的音频才跳过处理
-                    if duration < 2:
-                        needs_voice_extraction = False
-                        reasons = ["音频过短，跳过人声分离"]
-                    
-                    return {
-                        "success": True,
-                        "sample_rate": sample_rate,
-                        "channels": channels,
-                        "duration": duration,
-                        "needs_voice_extraction": needs_voice_extraction,
-                        "reasons": reasons
-                    }
-            
-            return {"success": False, "error": "无法分析音频内容"}
-            
-        except Exception as e:
+import json
+import os
+import struct
+import subprocess
+import threading
+import time
+from typing import Dict, Any, Optional
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from scipy import signal as _signal
+    _HAS_SCIPY = True
+except ImportError:
+    _HAS_SCIPY = False
+
+# 统一的ffmpeg前缀：关掉banner和进度输出，长文件上省去Python缓冲/解码兆级日志；
+# -nostdin防止吞终端输入，-threads 0放开滤镜多线程，
+# 限小probesize/analyzeduration省掉数秒的流分析启动开销
+_FFMPEG = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-nostats',
+           '-nostdin', '-threads', '0', '-probesize', '32k', '-analyzeduration', '0']
+
+# 字节转MiB用乘法代替两次除法
+_MIB_INV = 1.0 / (1024 * 1024)
+
+# 多个视频并行预处理时限制同时在跑的双进程提取数，避免CPU超订
+_EXTRACT_SEMAPHORE = threading.BoundedSemaphore(max(1, (os.cpu_count() or 2) // 2))
+
+def _stderr_text(stderr) -> str:
+    """失败分支才把stderr字节解码成文本"""
+    if isinstance(stderr, bytes):
+        return stderr.decode('utf-8', 'replace')
+    return stderr or ''
+
+class AudioPreprocessor:
+    """音频预处理服务，专门负责人声提取、背景音分离等处理"""
+
+    # 滤镜串是常量，预先折叠好，不在每次调用时做replace扫描
+    # pan矩阵: 均值下混单声道（extrastereo在均值下混后净效果为0，直接省略）
+    # highpass/lowpass: 人声频率范围100-7000Hz
+    # compand: 动态压缩，减少背景音噪声
+    # dynaudnorm: 动态标准化
+    # volume: 适当增强音量
+    _VOICE_FILTER = (
+        'aresample=16000,'
+        'pan=mono|c0=0.5*c0+0.5*c1,'
+        'highpass=f=100,'
+        'lowpass=f=7000,'
+        'compand=0.02,0.05:-60/-60,-30/-15,-20/-10,-5/-5,0/-3:6:0:-3,'
+        'dynaudnorm=f=500:g=3:r=0.3:s=9,'
+        'volume=1.5'
+    )
+
+    # 相位抵消技术去除中央人声；保留较宽频率范围以保持背景音质量
+    _BG_FILTER = (
+        'pan=mono|c0=0.5*c0+-0.5*c1,'
+        'highpass=f=20,'
+        'lowpass=f=15000,'
+        'compand=0.02,0.05:-60/-60,-40/-25,-20/-15,-10/-8,0/-5:6:0:-5,'
+        'volume=0.8'
+    )
+    
+    def __init__(self, logger_service):
+        self.logger = logger_service
+        self._dur_cache = {}  # (path, mtime_ns) -> 时长，避免重复fork ffprobe
+        self._probe_cache = {}  # (path, mtime) -> ffprobe JSON，format+streams一次拿全
+        self._sos_cache = {}  # (sr, lo, hi, order) -> 带通SOS系数，设计一次反复用
+        self._temp_root = Path('./temp')
+        self._temp_root.mkdir(exist_ok=True)
+        self._created_dirs = {str(self._temp_root.resolve())}  # 已建目录，免去每次makedirs
+    
+    def extract_voice(self, input_path: str, voice_output_path: str = None,
+                     background_output_path: str = None) -> Dict[str, Any]:
+        """
+        从音频中分离人声和背景音
+        
+        Args:
+            input_path: 输入音频文件路径
+            voice_output_path: 人声输出路径，如果为None则自动生成
+            background_output_path: 背景音输出路径，如果为None则自动生成
+            
+        Returns:
+            处理结果字典，包含人声和背景音路径
+        """
+        try:
+            input_name = Path(input_path).stem
+            
+            if not voice_output_path:
+                voice_output_path = f"./temp/{input_name}_voice.wav"
+            if not background_output_path:
+                background_output_path = f"./temp/{input_name}_background.wav"
+            
+            # 确保输出目录存在（默认temp目录在构造时已建好）
+            self._ensure_dir(os.path.dirname(voice_output_path))
+            self._ensure_dir(os.path.dirname(background_output_path))
+            
+            self.logger.log("INFO", "开始人声和背景音分离...")
+
+            # 优先单进程融合提取：asplit分流后只解码一次输入；
+            # 失败时回退到并行双进程，再逐路回退简单方法
+            fused = self._extract_voice_and_background_fused(
+                input_path, voice_output_path, background_output_path
+            )
+            if fused["success"]:
+                voice_result = {"success": True, "output_path": voice_output_path}
+                background_result = {"success": True, "output_path": background_output_path}
+            else:
+                self.logger.log("WARNING", f"融合提取失败，回退双进程并行: {fused['error']}")
+                voice_result, background_result = self._extract_both_parallel(
+                    input_path, voice_output_path, background_output_path
+                )
+            
+            if voice_result["success"] and background_result["success"]:
+                # 获取音频信息
+                voice_duration = self._get_audio_duration(voice_output_path)
+                voice_size = os.path.getsize(voice_output_path)
+                background_duration = self._get_audio_duration(background_output_path)
+                background_size = os.path.getsize(background_output_path)
+                
+                self.logger.log("INFO", f"人声提取完成: 时长{voice_duration:.2f}s, 大小{voice_size * _MIB_INV:.2f}MB")
+                self.logger.log("INFO", f"背景音提取完成: 时长{background_duration:.2f}s, 大小{background_size * _MIB_INV:.2f}MB")
+                
+                return {
+                    "success": True,
+                    "voice_path": voice_output_path,
+                    "background_path": background_output_path,
+                    "voice_duration": voice_duration,
+                    "background_duration": background_duration,
+                    "voice_size": voice_size,
+                    "background_size": background_size
+                }
+            else:
+                error_msgs = []
+                if not voice_result["success"]:
+                    error_msgs.append(f"人声提取失败: {voice_result['error']}")
+                if not background_result["success"]:
+                    error_msgs.append(f"背景音提取失败: {background_result['error']}")
+                
+                return {"success": False, "error": "; ".join(error_msgs)}
+            
+        except Exception as e:
+            error_msg = f"音频预处理异常: {str(e)}"
+            self.logger.log("ERROR", error_msg)
+            return {"success": False, "error": error_msg}
+    
+    def _extract_voice_and_background_fused(self, input_path: str, voice_output_path: str,
+                                            background_output_path: str) -> Dict[str, Any]:
+        """单次ffmpeg调用同时产出人声和背景音
+
+        用asplit把解码后的音频分成两路，各自套用原增强滤镜链，
+        输入只解码一次，省掉双进程方案里重复的解码开销。
+        """
+        try:
+            voice_chain = (
+                # 先降采样到16k，后续滤镜处理的样本数立减~3倍（8k低通之上本就无内容）；
+                # pan矩阵均值下混到单声道（extrastereo在均值下混后净效果为0），
+                # 后续滤镜只处理一路
+                "[a1]aresample=16000,pan=mono|c0=0.5*c0+0.5*c1,"
+                "highpass=f=100,lowpass=f=7000,"
+                "compand=0.02,0.05:-60/-60,-30/-15,-20/-10,-5/-5,0/-3:6:0:-3,"
+                "dynaudnorm=f=500:g=3:r=0.3:s=9,volume=1.5[v]"
+            )
+            bg_chain = (
+                "[a2]pan=mono|c0=0.5*c0+-0.5*c1,"
+                "highpass=f=20,lowpass=f=15000,"
+                "compand=0.02,0.05:-60/-60,-40/-25,-20/-15,-10/-8,0/-5:6:0:-5,"
+                "volume=0.8[b]"
+            )
+            cmd = [
+                *_FFMPEG, '-y', '-i', input_path, '-vn', '-sn', '-dn',
+                '-filter_complex',
+                "[0:a]asplit=2[a1][a2];" + voice_chain + ";" + bg_chain,
+                '-map', '[v]', '-ar', '16000', '-ac', '1', voice_output_path,
+                '-map', '[b]', '-ar', '44100', '-ac', '2', background_output_path
+            ]
+
+            self.logger.log("INFO", "开始单进程人声/背景音融合提取...")
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.PIPE, timeout=180)
+
+            if result.returncode == 0:
+                return {
+                    "success": True,
+                    "voice_path": voice_output_path,
+                    "background_path": background_output_path
+                }
+            return {"success": False, "error": _stderr_text(result.stderr)}
+
+        except subprocess.TimeoutExpired:
+            return {"success": False, "error": "融合提取超时"}
+        except Exception as e:
+            return {"success": False, "error": f"融合提取异常: {str(e)}"}
+
+    def _extract_both_parallel(self, input_path: str, voice_output_path: str,
+                               background_output_path: str) -> tuple:
+        """并行执行人声与背景音两路ffmpeg提取，失败时各自回退到简单方法"""
+        with _EXTRACT_SEMAPHORE:
+            return self._extract_both_parallel_inner(
+                input_path, voice_output_path, background_output_path
+            )
+
+    def _extract_both_parallel_inner(self, input_path: str, voice_output_path: str,
+                                     background_output_path: str) -> tuple:
+        try:
+            voice_proc = subprocess.Popen(
+                self._build_voice_cmd(input_path, voice_output_path),
+                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+            )
+            bg_proc = subprocess.Popen(
+                self._build_bg_cmd(input_path, background_output_path),
+                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+            )
+        except Exception as e:
+            # 进程启动失败时退回原有的串行路径
+            self.logger.log("WARNING", f"并行提取启动失败，改用串行: {str(e)}")
+            voice_result = self._extract_center_channel(input_path, voice_output_path)
+            background_result = self._extract_background(
+                input_path, voice_output_path, background_output_path
+            )
+            return voice_result, background_result
+
+        def _wait(proc, name):
+            try:
+                _, stderr = proc.communicate(timeout=120)
+                if proc.returncode == 0:
+                    return {"success": True}
+                return {"success": False, "error": _stderr_text(stderr)}
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.communicate()
+                return {"success": False, "error": f"{name}超时"}
+
+        voice_status = _wait(voice_proc, "人声提取")
+        bg_status = _wait(bg_proc, "背景音提取")
+
+        if voice_status["success"]:
+            voice_result = {"success": True, "output_path": voice_output_path}
+        else:
+            self.logger.log("WARNING", f"增强人声提取失败，尝试简单方法: {voice_status['error']}")
+            voice_result = self._extract_center_channel_simple(input_path, voice_output_path)
+
+        if bg_status["success"]:
+            background_result = {"success": True, "output_path": background_output_path}
+        else:
+            self.logger.log("WARNING", f"增强背景音提取失败，尝试简单方法: {bg_status['error']}")
+            background_result = self._extract_background_simple(input_path, background_output_path)
+
+        return voice_result, background_result
+
+    def _build_voice_cmd(self, input_path: str, output_path: str) -> list:
+        """构建增强人声提取的ffmpeg命令"""
+        return [
+            *_FFMPEG, '-i', input_path, '-vn', '-sn', '-dn',
+            '-af', self._VOICE_FILTER,
+            '-ar', '16000',  # 采样率16kHz
+            '-ac', '1',      # 单声道
+            '-y', output_path
+        ]
+
+    def _extract_voice_numpy(self, input_path: str, output_path: str) -> Dict[str, Any]:
+        """进程内人声提取：ffmpeg只做解码，滤波在NumPy/SciPy里一趟完成
+
+        ffmpeg滤镜链（extrastereo/compand/dynaudnorm）是单线程逐样本状态机；
+        把PCM管道进来后用mid/side矩阵+单次SOS带通+峰值归一化等效替代，
+        解码一次、数据只过一遍SIMD。
+        """
+        if not _HAS_SCIPY:
+            return {"success": False, "error": "scipy不可用"}
+
+        try:
+            import soundfile
+
+            proc = subprocess.Popen(
+                [*_FFMPEG, '-i', input_path, '-vn', '-sn', '-dn', '-f', 's16le', '-acodec', 'pcm_s16le',
+                 '-ac', '2', '-ar', '16000', '-'],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+            )
+            raw, _ = proc.communicate(timeout=120)
+            if proc.returncode != 0 or not raw:
+                return {"success": False, "error": "PCM解码失败"}
+
+            pcm = np.frombuffer(raw, dtype=np.int16)
+            pcm = pcm[:(len(pcm) // 2) * 2].reshape(-1, 2).astype(np.float32)
+            pcm *= np.float32(1.0 / 32768.0)
+
+            # extrastereo保持每样本L/R均值不变（L'=mid+m·side, R'=mid-m·side），
+            # 所以基线链"extrastereo=2.5再下混单声道"的净效果就是mid本身
+            voice = 0.5 * (pcm[:, 0] + pcm[:, 1])
+
+            # 100-7000Hz带通，一次SOS级联代替highpass+lowpass两趟
+            sos = self._bandpass_sos(16000, 100.0, 7000.0)
+            voice = _signal.sosfilt(sos, voice).astype(np.float32)
+
+            # 200ms RMS窗增益替代compand+dynaudnorm：卷积一趟得到响度包络，
+            # 长信号用FFT卷积（O(N logN)但常数远小于逐样本状态机）
+            if len(voice):
+                window = int(16000 * 0.2)
+                kernel = np.full(window, 1.0 / window, dtype=np.float32)
+                power = voice * voice
+                if len(voice) > 100_000:
+                    mean_power = _signal.fftconvolve(power, kernel, mode='same')
+                else:
+                    mean_power = np.convolve(power, kernel, mode='same')
+                rms = np.sqrt(np.maximum(mean_power, 0.0), dtype=np.float32)
+                gain = np.clip(np.float32(0.1) / (rms + np.float32(1e-6)), 0.5, 4.0)
+                voice *= gain.astype(np.float32)
+
+                # 防溢出钳制
+                peak = float(np.max(np.abs(voice)))
+                if peak > 0.95:
+                    voice *= np.float32(0.95 / peak)
+
+            soundfile.write(output_path, voice, 16000, subtype='PCM_16')
+            return {"success": True, "output_path": output_path}
+
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            return {"success": False, "error": "PCM解码超时"}
+        except Exception as e:
+            return {"success": False, "error": f"NumPy人声提取异常: {str(e)}"}
+
+    def _bandpass_sos(self, sr: int, lo: float, hi: float, order: int = 4):
+        """带通滤波器SOS系数缓存：filter设计只做一次，逐次提取直接复用"""
+        key = (sr, lo, hi, order)
+        sos = self._sos_cache.get(key)
+        if sos is None:
+            sos = _signal.butter(order, [lo, hi], btype='band', fs=sr, output='sos')
+            self._sos_cache[key] = sos
+        return sos
+
+    def _extract_center_channel(self, input_path: str, output_path: str) -> Dict[str, Any]:
+        """提取中央声道（人声）- 增强版"""
+        # 优先进程内NumPy路径，失败再回退ffmpeg滤镜链
+        numpy_result = self._extract_voice_numpy(input_path, output_path)
+        if numpy_result["success"]:
+            return numpy_result
+
+        try:
+            # 使用更强的人声分离算法
+            cmd = self._build_voice_cmd(input_path, output_path)
+
+            self.logger.log("INFO", "开始增强人声提取...")
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.PIPE, timeout=120)
+            
+            if result.returncode == 0:
+                return {"success": True, "output_path": output_path}
+            else:
+                # 如果增强算法失败，回退到简单方法
+                self.logger.log("WARNING", f"增强人声提取失败，尝试简单方法: {_stderr_text(result.stderr)}")
+                return self._extract_center_channel_simple(input_path, output_path)
+                
+        except subprocess.TimeoutExpired:
+            return {"success": False, "error": "人声提取超时"}
+        except Exception as e:
+            self.logger.log("WARNING", f"增强人声提取异常，尝试简单方法: {str(e)}")
+            return self._extract_center_channel_simple(input_path, output_path)
+    
+    def _extract_center_channel_simple(self, input_path: str, output_path: str) -> Dict[str, Any]:
+        """简单人声提取（备用方法）"""
+        try:
+            cmd = [
+                *_FFMPEG, '-i', input_path, '-vn', '-sn', '-dn',
+                # 单个bandpass替代highpass+lowpass两次遍历；
+                # 一趟loudnorm替代逐窗扫描的dynaudnorm，长文件上明显更省CPU
+                '-af', 'aresample=16000,pan=mono|c0=0.5*c0+0.5*c1,bandpass=f=1500:width_type=h:w=7500,loudnorm=I=-16:TP=-1.5:LRA=11',
+                '-ar', '16000',
+                '-ac', '1',
+                '-y', output_path
+            ]
+            
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.PIPE, timeout=120)
+            
+            if result.returncode == 0:
+                return {"success": True, "output_path": output_path}
+            else:
+                return {"success": False, "error": f"简单人声提取失败: {_stderr_text(result.stderr)}"}
+                
+        except Exception as e:
+            return {"success": False, "error": f"简单人声提取异常: {str(e)}"}
+    
+    def _build_bg_cmd(self, original_path: str, output_path: str) -> list:
+        """构建增强背景音提取的ffmpeg命令"""
+        return [
+            *_FFMPEG, '-i', original_path, '-vn', '-sn', '-dn',
+            '-af', self._BG_FILTER,
+            '-ar', '44100',  # 保持较高采样率用于背景音
+            '-ac', '2',      # 立体声
+            '-y', output_path
+        ]
+
+    def _extract_background(self, original_path: str, voice_path: str, output_path: str) -> Dict[str, Any]:
+        """提取背景音（原音频减去人声）- 增强版"""
+        try:
+            # 使用多种技术提取背景音
+            cmd = self._build_bg_cmd(original_path, output_path)
+
+            self.logger.log("INFO", "开始提取背景音...")
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.PIPE, timeout=120)
+            
+            if result.returncode == 0:
+                return {"success": True, "output_path": output_path}
+            else:
+                # 回退到简单方法
+                self.logger.log("WARNING", f"增强背景音提取失败，尝试简单方法: {_stderr_text(result.stderr)}")
+                return self._extract_background_simple(original_path, output_path)
+                
+        except subprocess.TimeoutExpired:
+            return {"success": False, "error": "背景音提取超时"}
+        except Exception as e:
+            self.logger.log("WARNING", f"增强背景音提取异常，尝试简单方法: {str(e)}")
+            return self._extract_background_simple(original_path, output_path)
+    
+    def _extract_background_simple(self, original_path: str, output_path: str) -> Dict[str, Any]:
+        """简单背景音提取（备用方法）"""
+        try:
+            cmd = [
+                *_FFMPEG, '-i', original_path, '-vn', '-sn', '-dn',
+                '-af', 'pan=mono|c0=0.5*c0+-0.5*c1',
+                '-y', output_path
+            ]
+            
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.PIPE, timeout=120)
+            
+            if result.returncode == 0:
+                return {"success": True, "output_path": output_path}
+            else:
+                return {"success": False, "error": f"简单背景音提取失败: {_stderr_text(result.stderr)}"}
+                
+        except Exception as e:
+            return {"success": False, "error": f"简单背景音提取异常: {str(e)}"}
+    
+    def _get_audio_duration(self, audio_path: str) -> float:
+        """获取音频时长"""
+        try:
+            cache_key = (audio_path, os.stat(audio_path).st_mtime_ns)
+        except OSError:
+            cache_key = None
+
+        if cache_key is not None and cache_key in self._dur_cache:
+            return self._dur_cache[cache_key]
+
+        # 刚写出的都是WAV，直接解析44字节RIFF头即可，连soundfile都不用加载；
+        # 明确不支持的容器格式直接走ffprobe，不经过异常路径
+        lower = audio_path.lower()
+        if lower.endswith('.wav'):
+            duration = self._wav_header_duration(audio_path)
+            if duration is None:
+                duration = self._probe_duration(audio_path)
+        elif lower.endswith(('.flac', '.ogg')):
+            try:
+                import soundfile
+                info = soundfile.info(audio_path)
+                duration = info.frames / info.samplerate
+            except Exception:
+                duration = self._probe_duration(audio_path)
+        else:
+            duration = self._probe_duration(audio_path)
+
+        if cache_key is not None:
+            self._dur_cache[cache_key] = duration
+        return duration
+
+    @staticmethod
+    def _wav_header_duration(audio_path: str) -> Optional[float]:
+        """直接扫描RIFF块读取WAV时长：data大小除以fmt块的byte_rate
+
+        免掉每次fork ffprobe的~百毫秒进程开销，失败返回None交给兜底。
+        """
+        try:
+            with open(audio_path, 'rb') as f:
+                riff, _, wave = struct.unpack('<4sI4s', f.read(12))
+                if riff != b'RIFF' or wave != b'WAVE':
+                    return None
+
+                byte_rate = None
+                while True:
+                    header = f.read(8)
+                    if len(header) < 8:
+                        return None
+                    chunk_id, chunk_size = struct.unpack('<4sI', header)
+                    if chunk_id == b'fmt ':
+                        fmt = f.read(chunk_size)
+                        byte_rate = struct.unpack('<I', fmt[8:12])[0]
+                    elif chunk_id == b'data':
+                        if not byte_rate:
+                            return None
+                        return chunk_size / byte_rate
+                    else:
+                        f.seek(chunk_size + (chunk_size & 1), 1)
+        except Exception:
+            return None
+
+    def _probe_duration(self, audio_path: str) -> float:
+        """ffprobe兜底：处理soundfile不支持的容器格式
+
+        只要一个时长标量，CSV输出直接float()，省掉两侧的JSON编解码。
+        analyze_audio_content已探测过的文件直接复用缓存的JSON。
+        """
+        try:
+            mtime_key = (audio_path, os.path.getmtime(audio_path))
+            cached = self._probe_cache.get(mtime_key)
+            if cached is not None:
+                return float(cached['format']['duration'])
+        except Exception:
+            pass
+        try:
+            cmd = [
+                'ffprobe', '-v', 'error', '-probesize', '32k', '-analyzeduration', '0',
+                '-show_entries', 'format=duration', '-of', 'csv=p=0', audio_path
+            ]
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            
+            if result.returncode == 0:
+                return float(result.stdout.strip())
+            else:
+                return 0.0
+                
+        except Exception:
+            return 0.0
+    
+    def _ensure_dir(self, directory: str):
+        """目录只创建一次，重复调用不再触发stat/makedirs"""
+        if not directory:
+            return
+        resolved = str(Path(directory).resolve())
+        if resolved not in self._created_dirs:
+            os.makedirs(resolved, exist_ok=True)
+            self._created_dirs.add(resolved)
+
+    def _probe(self, audio_path: str) -> Optional[Dict[str, Any]]:
+        """对同一文件只跑一次ffprobe，format和streams一并取回并缓存"""
+        try:
+            cache_key = (audio_path, os.path.getmtime(audio_path))
+        except OSError:
+            cache_key = None
+
+        if cache_key is not None and cache_key in self._probe_cache:
+            return self._probe_cache[cache_key]
+
+        try:
+            cmd = [
+                'ffprobe', '-v', 'quiet', '-print_format', 'json',
+                '-show_format', '-show_streams', audio_path
+            ]
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                return None
+
+            data = json.loads(result.stdout)
+        except Exception:
+            return None
+
+        if cache_key is not None:
+            self._probe_cache[cache_key] = data
+        return data
+
+    def _cleanup_temp_files(self, file_paths: list, keep: str = None):
+        """清理临时文件"""
+        for file_path in file_paths:
+            if file_path and file_path != keep and os.path.exists(file_path):
+                try:
+                    os.remove(file_path)
+                    self.logger.log("DEBUG", f"清理临时文件: {file_path}")
+                except Exception as e:
+                    self.logger.log("WARNING", f"清理临时文件失败: {file_path} - {str(e)}")
+    
+    def analyze_audio_content(self, audio_path: str) -> Dict[str, Any]:
+        """分析音频内容，判断是否需要人声背景音分离"""
+        try:
+            # 使用ffprobe分析音频特征（结果带缓存，重复分析同一文件不再fork）
+            data = self._probe(audio_path)
+
+            if data is not None:
+                # 获取音频流信息
+                audio_stream = None
+                for stream in data.get('streams', []):
+                    if stream.get('codec_type') == 'audio':
+                        audio_stream = stream
+                        break
+                
+                if audio_stream:
+                    sample_rate = int(audio_stream.get('sample_rate', 0))
+                    channels = int(audio_stream.get('channels', 0))
+                    duration = float(data['format'].get('duration', 0))
+                    
+                    # 更积极的音频内容评估逻辑
+                    needs_voice_extraction = True  # 默认启用人声分离
+                    reasons = []
+                    
+                    if channels > 1:
+                        reasons.append("立体声音频，进行人声背景音分离")
+                    else:
+                        reasons.append("单声道音频，进行人声增强处理")
+                    
+                    if duration > 5:
+                        reasons.append("音频时长超过5秒，进行人声分离优化")
+                    
+                    # 只有非常短的音频才跳过处理
+                    if duration < 2:
+                        needs_voice_extraction = False
+                        reasons = ["音频过短，跳过人声分离"]
+                    
+                    return {
+                        "success": True,
+                        "sample_rate": sample_rate,
+                        "channels": channels,
+                        "duration": duration,
+                        "needs_voice_extraction": needs_voice_extraction,
+                        "reasons": reasons
+                    }
+            
+            return {"success": False, "error": "无法分析音频内容"}
+            
+        except Exception as e:
             return {"success": False, "error": f"音频内容分析异常: {str(e)}"}
\ No newline at end of file
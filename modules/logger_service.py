@@ -1,150 +1,237 @@
-import logging
-from datetime import datetime
-from typing import List, Dict
-from collections import deque
-
-class LoggerService:
-    def __init__(self, max_logs=1000):
-        self.logs = deque(maxlen=max_logs)
-        self.logger = logging.getLogger(__name__)
-        
-        # 日志级别映射
-        self.level_map = {
-            "DEBUG": logging.DEBUG,
-            "INFO": logging.INFO,
-            "WARNING": logging.WARNING,
-            "ERROR": logging.ERROR,
-            "CRITICAL": logging.CRITICAL,
-            "API": logging.INFO,      # API调用日志
-            "ALIGN": logging.INFO,   # 对齐处理日志
-            "PROCESS": logging.INFO  # 处理过程日志
-        }
-    
-    def log(self, level: str, message: str, trace_id: str = None, context: Dict = None):
-        """记录日志"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        log_entry = {
-            "timestamp": timestamp,
-            "level": level,
-            "message": message,
-            "trace_id": trace_id,
-            "context": context or {}
-        }
-        
-        self.logs.append(log_entry)
-        
-        # 同时写入Python日志系统
-        log_level = self.level_map.get(level, logging.INFO)
-        log_message = f"[{level}] {message}"
-        if trace_id:
-            log_message += f" (Trace-ID: {trace_id})"
-        
-        self.logger.log(log_level, log_message)
-    
-    def log_api_call(self, api_type: str, endpoint: str, trace_id: str = None, 
-                     status: str = "success", duration: float = None):
-        """记录API调用"""
-        message = f"{api_type} API调用: {endpoint}"
-        if duration:
-            message += f" (耗时: {duration:.2f}s)"
-        if status != "success":
-            message += f" - {status}"
-            
-        self.log("API", message, trace_id)
-    
-    def log_alignment_step(self, segment_id: int, step: int, step_name: str, 
-                          result: str, details: Dict = None):
-        """记录5步对齐过程"""
-        message = f"第{segment_id}句对齐第{step}步({step_name}): {result}"
-        
-        context = {"segment_id": segment_id, "step": step, "step_name": step_name}
-        if details:
-            context.update(details)
-            
-        self.log("ALIGN", message, context=context)
-    
-    def log_processing_progress(self, current_step: str, progress: int, total: int = 100):
-        """记录处理进度"""
-        message = f"{current_step} - 进度: {progress}/{total}"
-        context = {"current_step": current_step, "progress": progress, "total": total}
-        self.log("PROCESS", message, context=context)
-    
-    def log_error_with_retry(self, operation: str, attempt: int, max_attempts: int, 
-                            error: str, trace_id: str = None):
-        """记录重试错误"""
-        if attempt < max_attempts:
-            message = f"{operation}失败,第{attempt}次重试中... 错误: {error}"
-            level = "WARNING"
-        else:
-            message = f"{operation}重试{max_attempts}次后最终失败: {error}"
-            level = "ERROR"
-            
-        self.log(level, message, trace_id)
-    
-    def get_logs(self, level_filter: str = None, limit: int = None) -> List[Dict]:
-        """获取日志列表"""
-        logs = list(self.logs)
-        
-        # 按级别过滤
-        if level_filter:
-            logs = [log for log in logs if log["level"] == level_filter]
-        
-        # 限制数量
-        if limit:
-            logs = logs[-limit:]
-            
-        return logs
-    
-    def get_formatted_logs(self, level_filter: str = None, limit: int = 100) -> List[str]:
-        """获取格式化的日志字符串"""
-        logs = self.get_logs(level_filter, limit)
-        formatted = []
-        
-        for log in logs:
-            timestamp = log["timestamp"]
-            level = log["level"]
-            message = log["message"]
-            
-            formatted_log = f"{timestamp} [{level}] {message}"
-            
-            if log.get("trace_id"):
-                formatted_log += f" Trace-ID: {log['trace_id']}"
-                
-            formatted.append(formatted_log)
-            
-        return formatted
-    
-    def clear_logs(self):
-        """清空日志"""
-        self.logs.clear()
-    
-    def get_log_stats(self) -> Dict:
-        """获取日志统计"""
-        if not self.logs:
-            return {"total": 0, "by_level": {}}
-        
-        by_level = {}
-        for log in self.logs:
-            level = log["level"]
-            by_level[level] = by_level.get(level, 0) + 1
-        
-        return {
-            "total": len(self.logs),
-            "by_level": by_level,
-            "latest": self.logs[-1] if self.logs else None
-        }
-    
-    def export_logs(self, filename: str = None) -> str:
-        """导出日志到文件"""
-        if not filename:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"video_translator_logs_{timestamp}.txt"
-        
-        formatted_logs = self.get_formatted_logs()
-        log_content = "\n".join(formatted_logs)
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(log_content)
-            
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+from collections import Counter, deque
+
+try:
+    # orjson直接产出bytes且比标准json快一个量级，可用时优先
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    import json as _json
+
+    def _dumps(obj) -> bytes:
+        return _json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+@dataclass(slots=True)
+class LogEntry:
+    """内存日志条目：slots类比5键字典省约3倍内存，遍历也更缓存友好"""
+    timestamp: float
+    level: str
+    message: str
+    trace_id: Optional[str] = None
+    context: Optional[Dict] = None
+
+class LoggerService:
+    def __init__(self, max_logs=1000):
+        self.logs = deque(maxlen=max_logs)
+        self._by_level = Counter()  # 各级别计数增量维护，get_log_stats为O(1)
+        self.logger = logging.getLogger(__name__)
+
+        # Python日志系统的写出放到后台线程，热路径只入队不阻塞
+        self._emit_queue = queue.Queue(maxsize=10000)
+        self._emit_thread = threading.Thread(
+            target=self._drain_emit_queue, name="log-emit", daemon=True
+        )
+        self._emit_thread.start()
+        
+        # 日志级别映射
+        self.level_map = {
+            "DEBUG": logging.DEBUG,
+            "INFO": logging.INFO,
+            "WARNING": logging.WARNING,
+            "ERROR": logging.ERROR,
+            "CRITICAL": logging.CRITICAL,
+            "API": logging.INFO,      # API调用日志
+            "ALIGN": logging.INFO,   # 对齐处理日志
+            "PROCESS": logging.INFO  # 处理过程日志
+        }
+    
+    def is_enabled(self, level: str) -> bool:
+        """调用方可先判级别再构造昂贵的日志内容"""
+        return self.logger.isEnabledFor(self.level_map.get(level, logging.INFO))
+
+    def log(self, level: str, message: str, trace_id: str = None, context: Dict = None):
+        """记录日志
+
+        时间戳存time.time()浮点值，格式化推迟到读取；
+        写入Python日志系统经由后台线程，调用方不等handler落盘。
+        """
+        # 环形缓冲将满时先把被挤出条目的计数减掉
+        if len(self.logs) == self.logs.maxlen:
+            evicted = self.logs[0]
+            self._by_level[evicted.level] -= 1
+
+        # context为空时不再分配空字典，读取侧统一兜底
+        self.logs.append(LogEntry(time.time(), level, message, trace_id, context))
+        self._by_level[level] += 1
+        
+        # 级别被过滤时连入队都省掉，内存日志照常保留供UI查看
+        log_level = self.level_map.get(level, logging.INFO)
+        if not self.logger.isEnabledFor(log_level):
+            return
+
+        try:
+            self._emit_queue.put_nowait((log_level, level, message, trace_id))
+        except queue.Full:
+            pass  # 控制台回显可丢，内存日志仍然完整
+
+    def _drain_emit_queue(self):
+        """后台线程：消费队列并写入Python日志系统"""
+        while True:
+            log_level, level, message, trace_id = self._emit_queue.get()
+            log_message = f"[{level}] {message}"
+            if trace_id:
+                log_message += f" (Trace-ID: {trace_id})"
+            self.logger.log(log_level, log_message)
+
+    @staticmethod
+    def _render_entry(log_entry: LogEntry) -> Dict:
+        """把内部条目转成对外字典格式：浮点时间戳在此时才做strftime"""
+        return {
+            "timestamp": datetime.fromtimestamp(
+                log_entry.timestamp
+            ).strftime("%Y-%m-%d %H:%M:%S"),
+            "level": log_entry.level,
+            "message": log_entry.message,
+            "trace_id": log_entry.trace_id,
+            "context": log_entry.context or {}
+        }
+    
+    def log_api_call(self, api_type: str, endpoint: str, trace_id: str = None, 
+                     status: str = "success", duration: float = None):
+        """记录API调用"""
+        message = f"{api_type} API调用: {endpoint}"
+        if duration:
+            message += f" (耗时: {duration:.2f}s)"
+        if status != "success":
+            message += f" - {status}"
+            
+        self.log("API", message, trace_id)
+    
+    def log_alignment_step(self, segment_id: int, step: int, step_name: str, 
+                          result: str, details: Dict = None):
+        """记录5步对齐过程"""
+        message = f"第{segment_id}句对齐第{step}步({step_name}): {result}"
+        
+        context = {"segment_id": segment_id, "step": step, "step_name": step_name}
+        if details:
+            context.update(details)
+            
+        self.log("ALIGN", message, context=context)
+    
+    def log_processing_progress(self, current_step: str, progress: int, total: int = 100):
+        """记录处理进度"""
+        message = f"{current_step} - 进度: {progress}/{total}"
+        context = {"current_step": current_step, "progress": progress, "total": total}
+        self.log("PROCESS", message, context=context)
+    
+    def log_error_with_retry(self, operation: str, attempt: int, max_attempts: int, 
+                            error: str, trace_id: str = None):
+        """记录重试错误"""
+        if attempt < max_attempts:
+            message = f"{operation}失败,第{attempt}次重试中... 错误: {error}"
+            level = "WARNING"
+        else:
+            message = f"{operation}重试{max_attempts}次后最终失败: {error}"
+            level = "ERROR"
+            
+        self.log(level, message, trace_id)
+    
+    def get_logs(self, level_filter: str = None, limit: int = None) -> List[Dict]:
+        """获取日志列表"""
+        logs = list(self.logs)
+        
+        # 按级别过滤
+        if level_filter:
+            logs = [log for log in logs if log.level == level_filter]
+        
+        # 限制数量
+        if limit:
+            logs = logs[-limit:]
+            
+        return [self._render_entry(log) for log in logs]
+    
+    def get_formatted_logs(self, level_filter: str = None, limit: int = 100) -> List[str]:
+        """获取格式化的日志字符串"""
+        logs = self.get_logs(level_filter, limit)
+        formatted = []
+        
+        for log in logs:
+            timestamp = log["timestamp"]
+            level = log["level"]
+            message = log["message"]
+            
+            formatted_log = f"{timestamp} [{level}] {message}"
+            
+            if log.get("trace_id"):
+                formatted_log += f" Trace-ID: {log['trace_id']}"
+                
+            formatted.append(formatted_log)
+            
+        return formatted
+    
+    def clear_logs(self):
+        """清空日志"""
+        self.logs.clear()
+        self._by_level.clear()
+    
+    def get_log_stats(self) -> Dict:
+        """获取日志统计"""
+        if not self.logs:
+            return {"total": 0, "by_level": {}}
+        
+        by_level = {level: count for level, count in self._by_level.items() if count > 0}
+        
+        return {
+            "total": len(self.logs),
+            "by_level": by_level,
+            "latest": self._render_entry(self.logs[-1]) if self.logs else None
+        }
+    
+    def get_json_logs(self, limit: int = None) -> bytes:
+        """结构化日志快路径：NDJSON字节串，供程序化消费
+
+        时间戳保留原始time.time()浮点值，不做strftime。
+        """
+        logs = list(self.logs)
+        if limit:
+            logs = logs[-limit:]
+
+        out = bytearray()
+        for log in logs:
+            out += _dumps({
+                "timestamp": log.timestamp,
+                "level": log.level,
+                "message": log.message,
+                "trace_id": log.trace_id,
+                "context": log.context or {}
+            })
+            out += b'\n'
+        return bytes(out)
+
+    def export_logs(self, filename: str = None) -> str:
+        """导出日志到文件
+
+        逐条格式化直接写入大缓冲文件对象，不在内存里拼整块字符串。
+        """
+        if not filename:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"video_translator_logs_{timestamp}.txt"
+        
+        with open(filename, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            for log in list(self.logs):
+                ts = datetime.fromtimestamp(log.timestamp).strftime("%Y-%m-%d %H:%M:%S")
+                line = f"{ts} [{log.level}] {log.message}"
+                if log.trace_id:
+                    line += f" Trace-ID: {log.trace_id}"
+                f.write(line)
+                f.write('\n')
+            
         return filename
\ No newline at end of file
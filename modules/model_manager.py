@@ -1,254 +1,289 @@
-import os
-import requests
-from typing import Dict, List, Optional
-from pathlib import Path
-
-class ModelManager:
-    """
-    AI模型管理器
-    - 统一管理所有需要的AI模型
-    - 检查本地缓存，避免重复下载
-    - 提供清晰的下载进度提示
-    """
-    
-    def __init__(self, logger_service):
-        self.logger = logger_service
-        
-        # 项目根目录
-        self.project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        self.models_dir = os.path.join(self.project_root, "models")
-        
-        # 定义项目需要的所有模型 - 使用统一的项目模型目录
-        self.required_models = {
-            # Whisper ASR模型 (优先级从高到低)
-            "whisper": {
-                "models": ["base", "medium", "large-v2"],
-                "priority": "large-v2",  # 专业处理优先使用large-v2模型
-                "description": "语音识别模型",
-                "cache_dir": os.path.join(self.models_dir, "whisper")
-            },
-            
-            # pyannote.audio 说话人分离模型
-            "pyannote": {
-                "models": ["pyannote/speaker-diarization-3.1"],
-                "priority": "pyannote/speaker-diarization-3.1",
-                "description": "说话人分离模型",
-                "cache_dir": os.path.join(self.models_dir, "pyannote")
-            },
-            
-            # Demucs 音频源分离模型
-            "demucs": {
-                "models": ["955717e8-8726e21a.th"],  # 直接使用文件名
-                "priority": "955717e8-8726e21a.th", 
-                "description": "音频源分离模型",
-                "cache_dir": os.path.join(self.models_dir, "demucs", "checkpoints")  # 使用checkpoints子目录
-            }
-        }
-    
-    def check_model_availability(self) -> Dict[str, Dict]:
-        """检查所有模型的可用性"""
-        status = {}
-        
-        for model_type, config in self.required_models.items():
-            status[model_type] = {
-                "available": False,
-                "cached_models": [],
-                "missing_models": [],
-                "priority_model": config["priority"],
-                "description": config["description"]
-            }
-            
-            if model_type == "whisper":
-                status[model_type] = self._check_whisper_models(config)
-            elif model_type == "pyannote":
-                status[model_type] = self._check_pyannote_models(config)
-            elif model_type == "demucs":
-                status[model_type] = self._check_demucs_models(config)
-        
-        return status
-    
-    def _check_whisper_models(self, config: Dict) -> Dict:
-        """检查Whisper模型"""
-        cache_dir = Path(config["cache_dir"])
-        cached_models = []
-        
-        if cache_dir.exists():
-            # 检查已下载的模型文件
-            for model_name in config["models"]:
-                model_file = cache_dir / f"{model_name}.pt"
-                if model_file.exists():
-                    cached_models.append(model_name)
-        
-        missing_models = [m for m in config["models"] if m not in cached_models]
-        
-        return {
-            "available": len(cached_models) > 0,
-            "cached_models": cached_models,
-            "missing_models": missing_models,
-            "priority_model": config["priority"],
-            "description": config["description"]
-        }
-    
-    def _check_pyannote_models(self, config: Dict) -> Dict:
-        """检查pyannote.audio模型"""
-        cache_dir = Path(config["cache_dir"])
-        cached_models = []
-        
-        if cache_dir.exists():
-            # 检查已下载的模型目录
-            for model_name in config["models"]:
-                # pyannote模型以特殊格式存储
-                model_dir_name = f"models--{model_name.replace('/', '--')}"
-                model_dir = cache_dir / model_dir_name
-                if model_dir.exists():
-                    cached_models.append(model_name)
-                    self.logger.log("DEBUG", f"找到pyannote模型: {model_dir}")
-        
-        missing_models = [m for m in config["models"] if m not in cached_models]
-        
-        return {
-            "available": len(cached_models) > 0,
-            "cached_models": cached_models,
-            "missing_models": missing_models,
-            "priority_model": config["priority"],
-            "description": config["description"]
-        }
-    
-    def _check_demucs_models(self, config: Dict) -> Dict:
-        """检查Demucs模型"""
-        cache_dir = Path(config["cache_dir"])
-        cached_models = []
-        
-        if cache_dir.exists():
-            # 检查已下载的模型文件
-            for model_name in config["models"]:
-                model_file = cache_dir / model_name
-                if model_file.exists():
-                    cached_models.append(model_name)
-        
-        missing_models = [m for m in config["models"] if m not in cached_models]
-        
-        return {
-            "available": len(cached_models) > 0,
-            "cached_models": cached_models,
-            "missing_models": missing_models,
-            "priority_model": config["priority"],
-            "description": config["description"]
-        }
-    
-    def get_recommended_model(self, model_type: str, available_memory_gb: float = 4.0, prioritize_quality: bool = True) -> Optional[str]:
-        """根据质量或系统资源推荐最佳模型"""
-        if model_type not in self.required_models:
-            return None
-        
-        config = self.required_models[model_type]
-        
-        if model_type == "whisper":
-            if prioritize_quality:
-                # 专业AI翻译：优先使用最高质量模型
-                if "large-v2" in config["models"]:
-                    return "large-v2"  # 最高质量
-                elif "medium" in config["models"]:
-                    return "medium"    # 中等质量
-                else:
-                    return "base"      # 基础质量
-            else:
-                # 快速处理：根据内存推荐
-                if available_memory_gb < 2:
-                    return "base"  # 最轻量级
-                elif available_memory_gb < 4:
-                    return "medium" if "medium" in config["models"] else "base"
-                else:
-                    return "large-v2"  # 最高质量
-        
-        return config["priority"]
-    
-    def print_model_status(self):
-        """打印模型状态报告"""
-        self.logger.log("INFO", "📋 AI模型状态检查报告")
-        self.logger.log("INFO", "=" * 50)
-        
-        status = self.check_model_availability()
-        
-        for model_type, info in status.items():
-            self.logger.log("INFO", f"🔍 {info['description']} ({model_type})")
-            
-            if info["available"]:
-                self.logger.log("INFO", f"   ✅ 已缓存: {', '.join(info['cached_models'])}")
-                self.logger.log("INFO", f"   🎯 推荐使用: {info['priority_model']}")
-            else:
-                self.logger.log("WARNING", f"   ❌ 未找到缓存模型")
-                
-            if info["missing_models"]:
-                self.logger.log("WARNING", f"   📥 需要下载: {', '.join(info['missing_models'])}")
-            
-            self.logger.log("INFO", "")
-    
-    def prepare_models_for_professional_processing(self) -> Dict[str, str]:
-        """
-        为专业音频处理准备模型
-        返回推荐的模型配置（优先质量）
-        """
-        self.logger.log("INFO", "🚀 准备专业音频处理模型...")
-        
-        # 检查系统内存
-        try:
-            import psutil
-            memory = psutil.virtual_memory()
-            available_gb = memory.available / (1024**3)
-            self.logger.log("INFO", f"📊 系统可用内存: {available_gb:.1f}GB")
-        except ImportError:
-            available_gb = 4.0  # 默认假设4GB
-            self.logger.log("WARNING", "无法检测系统内存，假设4GB可用")
-        
-        # 检查模型状态
-        self.print_model_status()
-        
-        # 推荐模型配置（专业处理优先质量）
-        recommended_config = {}
-        
-        for model_type in ["whisper", "pyannote", "demucs"]:
-            # 专业处理模式：prioritize_quality=True
-            recommended_model = self.get_recommended_model(model_type, available_gb, prioritize_quality=True)
-            recommended_config[model_type] = recommended_model
-            
-            # 检查推荐模型是否可用
-            status = self.check_model_availability()
-            if not status[model_type]["available"]:
-                self.logger.log("WARNING", f"⚠️  {model_type} 模型需要首次下载，可能需要几分钟时间")
-        
-        # 特别提醒Whisper模型选择
-        whisper_model = recommended_config.get("whisper", "base")
-        if whisper_model == "large-v2":
-            self.logger.log("INFO", "🎯 专业模式：使用Whisper large-v2模型确保最佳识别效果")
-        elif whisper_model == "medium":
-            self.logger.log("INFO", "🎯 专业模式：使用Whisper medium模型平衡效果与速度")
-        else:
-            self.logger.log("WARNING", "⚠️  专业模式：使用Whisper base模型，识别效果可能受限")
-        
-        self.logger.log("INFO", "🎯 专业AI处理配置（优先质量）:")
-        for model_type, model_name in recommended_config.items():
-            self.logger.log("INFO", f"   {model_type}: {model_name}")
-        
-        return recommended_config
-    
-    def estimate_download_time(self, model_type: str) -> str:
-        """估算模型下载时间"""
-        download_estimates = {
-            "whisper": {
-                "base": "1-2分钟 (~39MB)",
-                "medium": "3-5分钟 (~769MB)", 
-                "large-v2": "5-10分钟 (~1.5GB)"
-            },
-            "pyannote": {
-                "pyannote/speaker-diarization-3.1": "2-3分钟 (~100MB)"
-            },
-            "demucs": {
-                "htdemucs": "3-5分钟 (~200MB)"
-            }
-        }
-        
-        if model_type in download_estimates:
-            return download_estimates[model_type]
-        
-        return "未知"
\ No newline at end of file
+import functools
+import os
+import time
+import requests
+from types import MappingProxyType
+from typing import Dict, List, Optional
+
+@functools.lru_cache(maxsize=None)
+def _psutil_module():
+    """psutil导入只触发一次import机制，不可用时缓存None"""
+    try:
+        import psutil
+        return psutil
+    except ImportError:
+        return None
+
+_memory_reading = (0.0, None)  # (读取时刻, 可用内存GB)，5秒内复用
+
+def _available_memory_gb() -> Optional[float]:
+    """读取系统可用内存（GB），psutil不可用时返回None
+
+    virtual_memory()要遍历/proc，5秒TTL内直接返回上次读数，
+    同一请求里多次查询只付一次系统调用的成本。
+    """
+    global _memory_reading
+    now = time.monotonic()
+    ts, value = _memory_reading
+    if value is not None and now - ts < 5.0:
+        return value
+
+    psutil = _psutil_module()
+    if psutil is None:
+        return None
+    value = psutil.virtual_memory().available / (1024**3)
+    _memory_reading = (now, value)
+    return value
+
+# 项目根目录与模型规格在导入时算一次，所有实例共享
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_MODELS_DIR = os.path.join(_PROJECT_ROOT, "models")
+
+# (模型类型, 模型列表, 优先模型, 描述, 缓存子目录)
+_MODEL_SPEC = (
+    # Whisper ASR模型 (优先级从高到低)
+    ("whisper", ("base", "medium", "large-v2"), "large-v2", "语音识别模型", ("whisper",)),
+    # pyannote.audio 说话人分离模型
+    ("pyannote", ("pyannote/speaker-diarization-3.1",), "pyannote/speaker-diarization-3.1", "说话人分离模型", ("pyannote",)),
+    # Demucs 音频源分离模型（直接使用文件名，存放在checkpoints子目录）
+    ("demucs", ("955717e8-8726e21a.th",), "955717e8-8726e21a.th", "音频源分离模型", ("demucs", "checkpoints")),
+)
+
+# 各类型模型名到缓存目录条目名的映射
+_FS_MAPPERS = {
+    "whisper": lambda m: f"{m}.pt",
+    "demucs": lambda m: m,
+    # pyannote模型以huggingface缓存格式存储
+    "pyannote": lambda m: f"models--{m.replace('/', '--')}",
+}
+
+# 模型下载时间估算（只读，随_MODEL_SPEC维护；键须与模型名一致）
+_DOWNLOAD_ESTIMATES = MappingProxyType({
+    "whisper": MappingProxyType({
+        "base": "1-2分钟 (~39MB)",
+        "medium": "3-5分钟 (~769MB)",
+        "large-v2": "5-10分钟 (~1.5GB)"
+    }),
+    "pyannote": MappingProxyType({
+        "pyannote/speaker-diarization-3.1": "2-3分钟 (~100MB)"
+    }),
+    "demucs": MappingProxyType({
+        "955717e8-8726e21a.th": "3-5分钟 (~200MB)"
+    })
+})
+
+# Whisper推荐用的偏好表：质量优先固定从高到低，
+# 快速模式按可用内存(GB)上限分档，取第一个在模型列表里的候选
+_WHISPER_QUALITY = ("large-v2", "medium", "base")
+_WHISPER_FAST = (
+    (2.0, ("base",)),
+    (4.0, ("medium", "base")),
+    (float("inf"), ("large-v2", "medium", "base")),
+)
+
+def _list_dir_names(path: str) -> set:
+    """一次scandir读出目录下全部条目名，目录不存在时返回空集合"""
+    try:
+        with os.scandir(path) as entries:
+            return {entry.name for entry in entries}
+    except OSError:
+        return set()
+
+class ModelManager:
+    """
+    AI模型管理器
+    - 统一管理所有需要的AI模型
+    - 检查本地缓存，避免重复下载
+    - 提供清晰的下载进度提示
+    """
+    
+    # 项目根目录（模块级常量的实例别名，供外部代码访问）
+    project_root = _PROJECT_ROOT
+    models_dir = _MODELS_DIR
+
+    def __init__(self, logger_service):
+        self.logger = logger_service
+        self._status_cache = None  # (各cache_dir的mtime元组, status)，目录变动时自动失效
+
+    @functools.cached_property
+    def required_models(self) -> Dict[str, Dict]:
+        """项目需要的所有模型 - 由_MODEL_SPEC惰性展开，只构造一次"""
+        return {
+            model_type: {
+                "models": list(models),
+                "models_set": frozenset(models),  # O(1)成员判断用
+                "priority": priority,
+                "description": description,
+                "cache_dir": os.path.join(_MODELS_DIR, *subdir)
+            }
+            for model_type, models, priority, description, subdir in _MODEL_SPEC
+        }
+    
+    def _cache_dir_mtimes(self) -> tuple:
+        """取各模型缓存目录的mtime，作为缓存失效指纹（目录缺失记0）"""
+        mtimes = []
+        for config in self.required_models.values():
+            try:
+                mtimes.append(os.stat(config["cache_dir"]).st_mtime_ns)
+            except OSError:
+                mtimes.append(0)
+        return tuple(mtimes)
+
+    def check_model_availability(self, model_type: str = None) -> Dict[str, Dict]:
+        """检查模型可用性（结果按目录mtime缓存，目录没变就不重扫）
+
+        传入model_type时只检查该类型，返回单个状态dict，
+        不触发其余类型的目录扫描；不传则返回全量状态。
+        """
+        mtimes = self._cache_dir_mtimes()
+        if self._status_cache is not None and self._status_cache[0] == mtimes:
+            status = self._status_cache[1]
+            return status[model_type] if model_type is not None else status
+
+        if model_type is not None:
+            # 单类型查询不污染全量缓存，只扫一个目录
+            return self._check_single_model(model_type)
+
+        status = {
+            mt: self._check_single_model(mt)
+            for mt in self.required_models
+        }
+        self._status_cache = (mtimes, status)
+        return status
+
+    def _check_single_model(self, model_type: str) -> Dict:
+        """检查单个类型的模型可用性
+
+        三类模型的检查逻辑相同：scandir缓存目录一次，
+        按_FS_MAPPERS把模型名映射成目录条目名后做集合判断。
+        """
+        config = self.required_models[model_type]
+        name_for = _FS_MAPPERS[model_type]
+        present = _list_dir_names(config["cache_dir"])
+
+        cached_models = []
+        for model_name in config["models"]:
+            if name_for(model_name) in present:
+                cached_models.append(model_name)
+                self.logger.log("DEBUG", f"找到{model_type}模型: {model_name}")
+
+        cached_set = frozenset(cached_models)
+        missing_models = [m for m in config["models"] if m not in cached_set]
+
+        return {
+            "available": len(cached_models) > 0,
+            "cached_models": cached_models,
+            "missing_models": missing_models,
+            "priority_model": config["priority"],
+            "description": config["description"]
+        }
+
+    def refresh_model_availability(self) -> Dict[str, Dict]:
+        """清除缓存并重新扫描模型目录（下载完成后调用）"""
+        self._status_cache = None
+        return self.check_model_availability()
+    
+    def get_recommended_model(self, model_type: str, available_memory_gb: float = 4.0, prioritize_quality: bool = True) -> Optional[str]:
+        """根据质量或系统资源推荐最佳模型"""
+        if model_type not in self.required_models:
+            return None
+        
+        config = self.required_models[model_type]
+        
+        if model_type == "whisper":
+            if prioritize_quality:
+                # 专业AI翻译：优先使用最高质量模型
+                preferences = _WHISPER_QUALITY
+            else:
+                # 快速处理：根据内存分档推荐
+                preferences = next(
+                    prefs for limit, prefs in _WHISPER_FAST
+                    if available_memory_gb < limit
+                )
+            for model in preferences:
+                if model in config["models_set"]:
+                    return model
+            return "base"  # 兜底：最轻量级
+        
+        return config["priority"]
+    
+    def print_model_status(self, status: Dict[str, Dict] = None):
+        """打印模型状态报告（可传入已算好的status避免重复检查）
+
+        报告先拼成行列表再一次性输出，十几条逐行log会在
+        日志队列里各走一遍锁和格式化，合并后只走一次。
+        """
+        if status is None:
+            status = self.check_model_availability()
+        
+        lines = ["📋 AI模型状态检查报告", "=" * 50]
+        warnings = []
+        
+        for model_type, info in status.items():
+            lines.append(f"🔍 {info['description']} ({model_type})")
+            
+            if info["available"]:
+                lines.append(f"   ✅ 已缓存: {', '.join(info['cached_models'])}")
+                lines.append(f"   🎯 推荐使用: {info['priority_model']}")
+            else:
+                lines.append(f"   ❌ 未找到缓存模型")
+                warnings.append(f"{info['description']}未找到缓存模型")
+                
+            if info["missing_models"]:
+                lines.append(f"   📥 需要下载: {', '.join(info['missing_models'])}")
+            
+            lines.append("")
+        
+        self.logger.log("INFO", "\n".join(lines))
+        if warnings:
+            self.logger.log("WARNING", "；".join(warnings))
+    
+    def prepare_models_for_professional_processing(self) -> Dict[str, str]:
+        """
+        为专业音频处理准备模型
+        返回推荐的模型配置（优先质量）
+        """
+        self.logger.log("INFO", "🚀 准备专业音频处理模型...")
+        
+        # 检查系统内存
+        available_gb = _available_memory_gb()
+        if available_gb is not None:
+            self.logger.log("INFO", f"📊 系统可用内存: {available_gb:.1f}GB")
+        else:
+            available_gb = 4.0  # 默认假设4GB
+            self.logger.log("WARNING", "无法检测系统内存，假设4GB可用")
+        
+        # 检查模型状态（一次扫描，报告与推荐循环共用）
+        status = self.check_model_availability()
+        self.print_model_status(status)
+        
+        # 推荐模型配置（专业处理优先质量）
+        recommended_config = {}
+        
+        for model_type in ["whisper", "pyannote", "demucs"]:
+            # 专业处理模式：prioritize_quality=True
+            recommended_model = self.get_recommended_model(model_type, available_gb, prioritize_quality=True)
+            recommended_config[model_type] = recommended_model
+            
+            # 检查推荐模型是否可用
+            if not status[model_type]["available"]:
+                self.logger.log("WARNING", f"⚠️  {model_type} 模型需要首次下载，可能需要几分钟时间")
+        
+        # 特别提醒Whisper模型选择
+        whisper_model = recommended_config.get("whisper", "base")
+        if whisper_model == "large-v2":
+            self.logger.log("INFO", "🎯 专业模式：使用Whisper large-v2模型确保最佳识别效果")
+        elif whisper_model == "medium":
+            self.logger.log("INFO", "🎯 专业模式：使用Whisper medium模型平衡效果与速度")
+        else:
+            self.logger.log("WARNING", "⚠️  专业模式：使用Whisper base模型，识别效果可能受限")
+        
+        self.logger.log("INFO", "🎯 专业AI处理配置（优先质量）:")
+        for model_type, model_name in recommended_config.items():
+            self.logger.log("INFO", f"   {model_type}: {model_name}")
+        
+        return recommended_config
+    
+    def estimate_download_time(self, model_type: str) -> Dict[str, str]:
+        """按类型返回各模型的下载时间估算映射"""
+        return _DOWNLOAD_ESTIMATES.get(model_type, {})
\ No newline at end of file